@@ -1,19 +1,31 @@
 import tkinter as tk
-from tkinter import ttk, messagebox, simpledialog, Toplevel, Text, filedialog
+from tkinter import ttk, messagebox, Toplevel, Text
 import threading
 import time
+import functools
+import hashlib
+import itertools
 import json
 import os
-import re
+import queue
+import socket
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from urllib3.util.request import ACCEPT_ENCODING
 import base64
+import bisect
+from collections import OrderedDict, deque
 import shutil
-from io import BytesIO
+import sys
+from concurrent.futures import Future
+from contextlib import contextmanager
+from io import BytesIO, StringIO
 from pynput import keyboard
 from datetime import datetime
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter
 from typing import Optional, Dict, List, Union, Literal, Any
-from enum import Enum
+from urllib.parse import urlsplit
 
 
 # --- Important Notes ---
@@ -26,24 +38,202 @@ from enum import Enum
 #
 # It also uses 'pydantic'. Install with:
 # pip install pydantic
+#
+# 'orjson' is optional; when installed it is used for faster JSON parsing/serializing:
+# pip install orjson
+#
+# 'brotli' is optional; when installed responses are requested with Brotli compression:
+# pip install brotli
 
 try:
-    from PIL import Image, ImageTk
+    from PIL import Image, ImageOps
 except ImportError:
     messagebox.showerror("Missing Dependency", "Pillow library not found. Please run 'pip install Pillow'")
     exit()
 
+try:
+    import orjson
+
+    def json_loads(data):
+        return orjson.loads(data)
+
+    def json_dumps_bytes(obj, indent=True):
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0)
+except ImportError:
+    def json_loads(data):
+        return json.loads(data)
+
+    def json_dumps_bytes(obj, indent=True):
+        if indent:
+            return json.dumps(obj, indent=4).encode("utf-8")
+        return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+
+def json_dumps_text(obj):
+    """Pretty-prints obj as a str for showing in an editable Text widget."""
+    return json_dumps_bytes(obj).decode("utf-8")
+
+
+def write_file_atomic(path, data):
+    """Writes bytes to a temp file and swaps it into place so a crash never leaves a torn file."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def run_in_background(func, *args, report_errors=False):
+    """Runs func on a daemon thread and returns a Future for its result.
+
+    Callers that never collect the result pass report_errors, so a failure still prints a
+    traceback the way an uncaught exception in a plain thread would.
+    """
+    future = Future()
+
+    def worker():
+        try:
+            future.set_result(func(*args))
+        except BaseException as e:
+            future.set_exception(e)
+            if report_errors:
+                sys.excepthook(type(e), e, e.__traceback__)
+
+    threading.Thread(target=worker, daemon=True).start()
+    return future
+
+
+def read_config_file(path):
+    """Reads and parses a JSON config file; returns None when it does not exist."""
+    try:
+        with open(path, 'rb') as f:
+            return json_loads(f.read())
+    except FileNotFoundError:
+        return None
+
+
+def read_json_lines_file(path):
+    """Parses a JSON Lines file into a list; returns None when it does not exist.
+
+    An unparseable last line is what an interrupted append leaves behind, so it is cut off
+    the file instead of failing the whole read.
+    """
+    try:
+        with open(path, 'rb') as f:
+            lines = f.readlines()
+    except FileNotFoundError:
+        return None
+    items = []
+    offset = 0
+    for number, line in enumerate(lines):
+        if line.strip():
+            try:
+                items.append(json_loads(line))
+            except ValueError:
+                if any(rest.strip() for rest in lines[number + 1:]):
+                    raise
+                with open(path, 'r+b') as f:
+                    f.truncate(offset)
+                break
+        offset += len(line)
+    return items
+
+
+OPENROUTER_BASE_URL = "https://openrouter.ai/api/v1"
+ERROR_BODY_PREVIEW_CHARS = 500
+# Providers that only reuse a cached prompt prefix when it is marked with cache_control
+# (OpenAI, DeepSeek and others cache automatically and get the plain form)
+CACHE_CONTROL_MODEL_PREFIXES = ("anthropic/", "google/gemini")
+
 
-class VerbosityLevel(str, Enum):
-    LOW = "low"
-    MEDIUM = "medium"
-    HIGH = "high"
+def _create_http_session():
+    """Builds a pooled session so repeated OpenRouter calls reuse one keep-alive connection."""
+    session = requests.Session()
+    # Advertise every encoding urllib3 can decode here (br/zstd only when their packages are installed)
+    session.headers['Accept-Encoding'] = ACCEPT_ENCODING
+    retries = Retry(total=2, backoff_factor=0.3, status_forcelist=(429, 500, 502, 503, 504))
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=retries)
+    session.mount("https://", adapter)
+    return session
 
 
-class ReasoningLevel(str, Enum):
-    LOW = "low"
-    MEDIUM = "medium"
-    HIGH = "high"
+_SESSION = _create_http_session()
+
+RESPONSE_CACHE_SIZE = 256 # Replies to temperature-0 requests, shared by all chat windows
+FILE_CONTEXT_CACHE_SIZE = 32 # Recently used "Use File" contents, shared by all chat windows
+IMAGE_CACHE_SIZE = 8 # Encoded uploads kept so re-attaching an image reuses its data URL
+
+
+class LRUCache:
+    """A small thread-safe least-recently-used cache; get() returns None for a missing key."""
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.items = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            value = self.items.get(key)
+            if value is not None:
+                self.items.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self.lock:
+            self.items[key] = value
+            self.items.move_to_end(key)
+            if len(self.items) > self.max_size:
+                self.items.popitem(last=False)
+
+
+# Keyed by a digest of the exact request body
+_response_cache = LRUCache(RESPONSE_CACHE_SIZE)
+
+
+def warm_up_connection():
+    """Opens a pooled connection to OpenRouter ahead of time so the first chat turn skips the TLS handshake."""
+    try:
+        _SESSION.head(OPENROUTER_BASE_URL, timeout=10)
+    except requests.exceptions.RequestException:
+        pass
+
+# OpenRouter's resolved addresses are reused for a few minutes so new pooled connections skip the
+# DNS lookup; every other host resolves normally
+DNS_CACHE_TTL = 300
+_DNS_CACHED_HOST = urlsplit(OPENROUTER_BASE_URL).hostname
+_dns_cache = {}
+_dns_cache_lock = threading.Lock()
+_system_getaddrinfo = socket.getaddrinfo
+
+
+def _cached_getaddrinfo(*args, **kwargs):
+    host = args[0] if args else kwargs.get('host')
+    if host != _DNS_CACHED_HOST:
+        return _system_getaddrinfo(*args, **kwargs)
+    key = (args, tuple(sorted(kwargs.items())))
+    now = time.monotonic()
+    with _dns_cache_lock:
+        cached = _dns_cache.get(key)
+        if cached and now - cached[0] < DNS_CACHE_TTL:
+            return cached[1]
+    result = _system_getaddrinfo(*args, **kwargs)
+    with _dns_cache_lock:
+        # Drop expired lookups so the handful of port/family variants never pile up
+        for stale in [k for k, (resolved_at, _) in _dns_cache.items() if now - resolved_at >= DNS_CACHE_TTL]:
+            del _dns_cache[stale]
+        _dns_cache[key] = (now, result)
+    return result
+
+
+socket.getaddrinfo = _cached_getaddrinfo
+
+
+# Plain Literals validate as a single string check and dump without an Enum-to-value conversion
+VerbosityLevel = Literal["low", "medium", "high"]
+ReasoningLevel = Literal["low", "medium", "high"]
+ToolChoiceMode = Literal["none", "auto", "required"]
 
 
 class ResponseFormat(BaseModel):
@@ -65,6 +255,9 @@ class OpenRouterAPIParameters(BaseModel):
     This model includes all the sampling parameters that can be used
     to configure OpenRouter API requests for language model generation.
     """
+    # Profiles also carry keys such as "model" that are sent separately; drop them without error
+    model_config = ConfigDict(extra="ignore", frozen=True)
+
     temperature: Optional[float] = Field(
         default=1.0,
         ge=0.0,
@@ -151,7 +344,7 @@ class OpenRouterAPIParameters(BaseModel):
         default=None,
         description="Tool calling parameter following OpenAI's tool calling format"
     )
-    tool_choice: Optional[Union[str, ToolChoice]] = Field(
+    tool_choice: Optional[Union[ToolChoiceMode, ToolChoice]] = Field(
         default=None,
         description="Controls which tool is called: 'none', 'auto', 'required', or specific tool"
     )
@@ -160,7 +353,7 @@ class OpenRouterAPIParameters(BaseModel):
         description="Whether to enable parallel function calling during tool use"
     )
     verbosity: Optional[VerbosityLevel] = Field(
-        default=VerbosityLevel.MEDIUM,
+        default="medium",
         description="Controls verbosity and length of model response"
     )
     reasoning: Optional[ReasoningLevel] = Field(
@@ -169,6 +362,72 @@ class OpenRouterAPIParameters(BaseModel):
     )
 
 
+_PARAMS_ADAPTER = TypeAdapter(OpenRouterAPIParameters)
+_API_PARAM_FIELDS = frozenset(OpenRouterAPIParameters.model_fields)
+
+
+@functools.lru_cache(maxsize=8)
+def _validated_api_params(settings_key):
+    return _PARAMS_ADAPTER.validate_json(settings_key).model_dump(exclude_none=True, mode="json")
+
+
+def validated_api_params(settings):
+    """Validates advanced settings and returns the API parameter dict, memoized per settings value."""
+    # Keys like "model" and "system_message" are not API parameters; leaving them out of the
+    # cache key keeps it small and lets profiles that differ only in those share an entry
+    settings = {key: value for key, value in settings.items() if key in _API_PARAM_FIELDS}
+    try:
+        settings_key = json.dumps(settings, sort_keys=True)
+    except (TypeError, ValueError):
+        return _PARAMS_ADAPTER.validate_python(settings).model_dump(exclude_none=True, mode="json")
+    return _validated_api_params(settings_key)
+
+
+class StreamError(Exception):
+    """An error chunk sent by OpenRouter mid-stream, after the HTTP status was already 200."""
+
+
+def iter_sse_chunks(response):
+    """Yields the decoded JSON payloads of an OpenRouter server-sent event stream."""
+    for line in response.iter_lines():
+        # Skip blank event separators and ': OPENROUTER PROCESSING' keep-alive comments
+        if not line.startswith(b"data: "):
+            continue
+        data = line[6:]
+        if data == b"[DONE]":
+            break
+        yield json_loads(data)
+
+
+def append_treeview_rows(tree, rows):
+    """Appends (iid, values) pairs to a Treeview using raw Tcl insert calls."""
+    # Skips ttk's per-call option formatting, which dominates when inserting many rows
+    call, path = tree.tk.call, tree._w
+    for iid, values in rows:
+        call(path, 'insert', '', 'end', '-id', iid, '-values', values)
+
+
+def fill_treeview(tree, rows):
+    """Replaces the rows of a Treeview with (iid, values) pairs."""
+    tree.delete(*tree.get_children())
+    append_treeview_rows(tree, rows)
+
+
+def fill_treeview_in_chunks(tree, rows, chunk_size=200):
+    """Like fill_treeview, but only the first chunk is inserted now; the rest follow in idle callbacks."""
+    rows = list(rows) # Snapshot, since the source may change between callbacks
+    tree.delete(*tree.get_children())
+
+    def insert_chunk(start):
+        if not tree.winfo_exists():
+            return # The window was closed before all rows were in
+        append_treeview_rows(tree, rows[start:start + chunk_size])
+        if start + chunk_size < len(rows):
+            tree.after_idle(insert_chunk, start + chunk_size)
+
+    insert_chunk(0)
+
+
 class SelectProfileWindow(Toplevel):
     """A window to select a saved LLM configuration profile."""
     def __init__(self, parent):
@@ -194,8 +453,8 @@ class SelectProfileWindow(Toplevel):
         self.profile_listbox = tk.Listbox(list_frame)
         self.profile_listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
 
-        for name in self.profiles.keys():
-            self.profile_listbox.insert(tk.END, name)
+        # One insert call for all names, in the same sorted order as the LLM Profiles tab
+        self.profile_listbox.insert(tk.END, *self.app.profile_names)
 
         scrollbar = ttk.Scrollbar(list_frame, orient=tk.VERTICAL, command=self.profile_listbox.yview)
         self.profile_listbox.config(yscrollcommand=scrollbar.set)
@@ -225,6 +484,12 @@ class SelectProfileWindow(Toplevel):
 
 class LLMQueryWindow(Toplevel):
     """A separate window for querying a specific LLM configuration."""
+    MAX_IMAGE_SIDE = 2048 # Larger uploads are downscaled; vision models don't use the extra pixels
+    MAX_FILE_CONTEXT_BYTES = 256 * 1024 # Bigger files send only their head and tail
+    BYTES_PER_TOKEN = 3 # Conservative JSON-bytes-per-token estimate used to fit history into a model's context
+    IMAGE_TOKEN_ESTIMATE = 1500 # Rough prompt tokens per attached image, used instead of its encoded size
+    MAX_HISTORY_TURNS = 20 # User turns sent with each request unless the settings give "max_history_turns" (0 = all)
+
     def __init__(self, app, config_name, config_details, initial_prompt=None, initial_response=None):
         super().__init__(app.root)
         self.title(f"Query: {config_name}")
@@ -235,8 +500,19 @@ class LLMQueryWindow(Toplevel):
         self.advanced_settings = {}
         self.current_profile_name = "Default"
         self.uploaded_image_data = None
+        self.pending_image = None # (future, filename) while an upload is still being encoded
+        self.pending_file_reads = [] # (future, filename) of "Use File" reads not yet added to the history
         self.generated_image = None
         self.history = [] # For conversation history
+        self.last_index_by_role = {} # Latest history index of a non-empty message per role
+        self.encoded_history = [] # JSON bytes of each history message, reused across requests
+        self.rendered_count = 0 # History messages already shown in the chat display
+        self.request_in_flight = False
+        self.closing = threading.Event() # Tells a streaming worker to drop its connection
+        self.chat_text = StringIO() # Plain-text copy of the chat display, so saving it needs no Tk round-trip
+        self.chat_backlog = [] # text/tag pairs posted by the worker, waiting for the next UI flush
+        self.chat_backlog_lock = threading.Lock()
+        self.queued_content = [] # Parts typed while a reply is streaming, sent together afterwards
 
         self.create_widgets(initial_prompt, initial_response)
         self.create_context_menus()
@@ -274,6 +550,10 @@ class LLMQueryWindow(Toplevel):
         chat_scrollbar = ttk.Scrollbar(chat_frame, orient=tk.VERTICAL, command=self.chat_display.yview)
         chat_scrollbar.grid(row=0, column=1, sticky="ns")
         self.chat_display['yscrollcommand'] = chat_scrollbar.set
+        self.chat_display.tag_configure("user_role", font=("Arial", 11, "bold"))
+        self.chat_display.tag_configure("assistant_role", font=("Arial", 11, "bold"), foreground="blue")
+        self.chat_display.tag_configure("system", font=("Arial", 9, "italic"), foreground="gray")
+        self.chat_display.tag_configure("error", font=("Arial", 10, "italic"), foreground="red")
 
         input_frame = ttk.Frame(main_frame)
         input_frame.grid(row=2, column=0, sticky="ew", pady=(5, 0))
@@ -291,8 +571,8 @@ class LLMQueryWindow(Toplevel):
 
         if initial_prompt: self.prompt_entry.insert("1.0", initial_prompt)
         if initial_response:
-            self.history.append({"role": "assistant", "content": initial_response})
-            self.update_chat_display()
+            self.add_to_history({"role": "assistant", "content": initial_response})
+            self.render_new_messages()
 
         self.protocol("WM_DELETE_WINDOW", self.on_close)
 
@@ -306,13 +586,33 @@ class LLMQueryWindow(Toplevel):
 
     def start_new_conversation(self):
         self.history = []
+        self.last_index_by_role = {}
+        self.encoded_history = []
+        self.queued_content = []
+        self.pending_file_reads = []
         self.clear_uploaded_image()
         self.update_chat_display()
         self.prompt_entry.delete("1.0", tk.END)
         self.append_to_chat_display("--- New conversation started ---\n", "system")
 
+    def add_to_history(self, message):
+        self.history.append(message)
+        if message.get('content'):
+            self.last_index_by_role[message['role']] = len(self.history) - 1
+
+    def last_content(self, role):
+        """Returns the text of the latest non-empty message from role, or None."""
+        index = self.last_index_by_role.get(role)
+        if index is None:
+            return None
+        content = self.history[index]['content']
+        if isinstance(content, list):
+            # Multimodal user turns: keep the text parts, images can't be saved as text
+            content = "\n".join(part['text'] for part in content if part.get('type') == 'text')
+        return content
+
     def save_prompt(self):
-        last_user_prompt = next((item['content'] for item in reversed(self.history) if item['role'] == 'user'), None)
+        last_user_prompt = self.last_content('user')
         if not last_user_prompt:
             messagebox.showwarning("Save Error", "No prompt found in history.", parent=self)
             return
@@ -320,7 +620,7 @@ class LLMQueryWindow(Toplevel):
         messagebox.showinfo("Success", "Last prompt saved.", parent=self)
 
     def save_response(self):
-        last_assistant_response = next((item['content'] for item in reversed(self.history) if item['role'] == 'assistant'), None)
+        last_assistant_response = self.last_content('assistant')
         if not last_assistant_response:
             messagebox.showwarning("Save Error", "No response found in history.", parent=self)
             return
@@ -328,7 +628,7 @@ class LLMQueryWindow(Toplevel):
         messagebox.showinfo("Success", "Last response saved.", parent=self)
 
     def save_both(self):
-        full_history_text = self.chat_display.get("1.0", tk.END).strip()
+        full_history_text = self.chat_text.getvalue().strip()
         if not full_history_text:
             messagebox.showwarning("Save Error", "History is empty.", parent=self)
             return
@@ -336,33 +636,129 @@ class LLMQueryWindow(Toplevel):
         messagebox.showinfo("Success", "Full conversation history saved.", parent=self)
 
     def upload_image(self):
+        from tkinter import filedialog # Only needed once a dialog is opened; keeps it out of startup
         file_path = filedialog.askopenfilename(filetypes=[("Image Files", "*.png *.jpg *.jpeg *.webp *.gif")])
         if not file_path: return
+        self.clear_uploaded_image()
+        # Decoding, resizing and base64 take a noticeable moment for large photos; keep the window responsive
+        future = run_in_background(self.image_data_url, file_path)
+        self.pending_image = (future, os.path.basename(file_path))
+        future.add_done_callback(lambda f: self.app.call_in_ui(self.finish_image_upload, f))
+
+    def image_data_url(self, file_path):
+        """Returns the upload's data URL; re-attaching an unchanged file reuses the string already built."""
+        stat = os.stat(file_path)
+        key = (file_path, stat.st_mtime_ns, stat.st_size)
+        data_url = self.app.image_cache.get(key)
+        if data_url is None:
+            data_url = self.encode_data_url(file_path)
+            self.app.image_cache.put(key, data_url)
+        return data_url
+
+    def encode_data_url(self, file_path):
+        image_file, mime_type = self.encode_image_for_upload(file_path)
+        data_url = bytearray(f"data:{mime_type};base64,".encode('ascii'))
+        with image_file:
+            # Chunks are a multiple of 3 bytes, so their encodings join without padding in between
+            for chunk in iter(functools.partial(image_file.read, 3 * 64 * 1024), b""):
+                data_url += base64.b64encode(chunk)
+        return data_url.decode('ascii')
+
+    def finish_image_upload(self, future):
+        """Applies an encoded upload; a no-op if it was already applied or replaced, or the window is closing."""
+        if self.closing.is_set():
+            return
+        if self.pending_image is None or self.pending_image[0] is not future:
+            return
+        filename = self.pending_image[1]
+        self.pending_image = None
         try:
-            with open(file_path, "rb") as image_file:
-                encoded_string = base64.b64encode(image_file.read()).decode('utf-8')
-            mime_type = f"image/{file_path.split('.')[-1]}"
-            self.uploaded_image_data = f"data:{mime_type};base64,{encoded_string}"
-            self.append_to_chat_display(f"[Image Uploaded: {os.path.basename(file_path)}]\n", "system")
+            self.uploaded_image_data = future.result()
+            self.append_to_chat_display(f"[Image Uploaded: {filename}]\n", "system")
         except Exception as e:
             messagebox.showerror("Image Error", f"Failed to load image: {e}")
             self.clear_uploaded_image()
 
+    def encode_image_for_upload(self, file_path):
+        """Returns a binary file of the image to upload and its MIME type, downscaling images larger than MAX_IMAGE_SIDE."""
+        with Image.open(file_path) as image:
+            # Phone JPEGs carrying depth or gain maps open as multi-frame "MPO"; their first frame is a plain JPEG
+            image_format = "JPEG" if image.format == "MPO" else image.format
+            if max(image.size) <= self.MAX_IMAGE_SIDE and image_format in ("JPEG", "PNG", "WEBP", "GIF"):
+                # Small enough and in a format providers accept: send the file untouched
+                # (keeps GIF animation, original quality and the EXIF orientation)
+                return open(file_path, "rb"), Image.MIME[image_format]
+            # save() drops EXIF, so bake the orientation into the pixels first
+            image = ImageOps.exif_transpose(image)
+            image.thumbnail((self.MAX_IMAGE_SIDE, self.MAX_IMAGE_SIDE))
+            if image_format not in ("JPEG", "PNG", "WEBP"):
+                image_format = "PNG"
+                if image.mode not in ("1", "L", "LA", "I", "P", "RGB", "RGBA"):
+                    image = image.convert("RGBA") # e.g. CMYK TIFFs, which PNG can't store
+            buffer = BytesIO()
+            image.save(buffer, format=image_format, quality=85, optimize=True)
+            buffer.seek(0)
+            return buffer, Image.MIME[image_format]
+
     def use_file(self):
         UseFileWindow(self)
 
+    def read_file_context(self, path):
+        """Returns the text to send for a file, reusing the app's copy while the file is unchanged."""
+        stat = os.stat(path)
+        key = (path, stat.st_mtime_ns, stat.st_size)
+        content = self.app.file_context_cache.get(key)
+        if content is None:
+            content = self.read_file_text(path, stat.st_size)
+            self.app.file_context_cache.put(key, content)
+        return content
+
+    def read_file_text(self, path, size):
+        """Reads a file as text, keeping only its head and tail when it exceeds MAX_FILE_CONTEXT_BYTES."""
+        if size <= self.MAX_FILE_CONTEXT_BYTES:
+            with open(path, 'r', encoding='utf-8') as f:
+                return f.read()
+        keep = self.MAX_FILE_CONTEXT_BYTES // 2
+        with open(path, 'rb') as f:
+            head = f.read(keep)
+            f.seek(-keep, os.SEEK_END)
+            tail = f.read(keep)
+        # The cut points can land inside a multi-byte character, so decode leniently
+        return (f"{head.decode('utf-8', 'replace')}\n\n"
+                f"[... {size - 2 * keep} bytes omitted from a {size}-byte file ...]\n\n"
+                f"{tail.decode('utf-8', 'replace')}")
+
     def add_file_context_to_chat(self, file_info):
-        try:
-            with open(file_info['path'], 'r', encoding='utf-8') as f:
-                content = f.read()
-            context_text = f"--- Using File: {file_info['filename']} ---\n\n{content}\n\n--- End of File ---"
-            self.history.append({"role": "user", "content": context_text})
-            self.update_chat_display()
-        except Exception as e:
-            messagebox.showerror("File Read Error", f"Could not read file: {e}", parent=self)
+        # Reading (and decoding) a large file takes a moment; do it off the Tk thread
+        future = run_in_background(self.read_file_context, file_info['path'])
+        self.pending_file_reads.append((future, file_info['filename']))
+        future.add_done_callback(lambda f: self.app.call_in_ui(self.finish_file_reads))
+
+    def finish_file_reads(self, wait=False):
+        """Adds finished file reads to the history in the order the files were chosen; with wait, blocks for the rest."""
+        if self.closing.is_set():
+            return
+        while self.pending_file_reads and (wait or self.pending_file_reads[0][0].done()):
+            future, filename = self.pending_file_reads.pop(0)
+            try:
+                content = future.result()
+            except Exception as e:
+                messagebox.showerror("File Read Error", f"Could not read file: {e}", parent=self)
+                continue
+            context_text = f"--- Using File: {filename} ---\n\n{content}\n\n--- End of File ---"
+            if self.request_in_flight:
+                # The history and display belong to the streaming reply until it finishes (a tool call
+                # and its results must stay adjacent); send the file with the queued follow-up instead
+                self.queued_content.append({"type": "text", "text": context_text})
+                self.append_to_chat_display(f"[Queued file: {filename} will be sent when the current reply finishes]\n", "system")
+            else:
+                self.add_to_history({"role": "user", "content": context_text})
+        if not self.request_in_flight:
+            self.render_new_messages()
 
     def clear_uploaded_image(self):
         self.uploaded_image_data = None
+        self.pending_image = None
 
     def create_context_menus(self):
         self.context_menu = tk.Menu(self, tearoff=0)
@@ -378,7 +774,8 @@ class LLMQueryWindow(Toplevel):
         SelectProfileWindow(self)
 
     def apply_profile(self, profile_data, profile_name):
-        self.advanced_settings = profile_data.copy()
+        # Profiles are only ever replaced, never edited in place, so sharing the dict is safe
+        self.advanced_settings = profile_data
         self.current_profile_name = profile_name
         self.update_title()
         self.append_to_chat_display(f"--- Applied settings profile: {profile_name} ---\n", "system")
@@ -387,28 +784,43 @@ class LLMQueryWindow(Toplevel):
         self.title(f"Query: {self.config_name} (Profile: {self.current_profile_name})")
 
     def on_close(self):
+        self.closing.set()
         self.app.unregister_query_window(self.config_name)
         self.destroy()
 
     def send_query_threaded(self, event=None):
+        if self.pending_image is not None:
+            # Sent before encoding finished: wait for it rather than dropping the image
+            self.finish_image_upload(self.pending_image[0])
+        if self.pending_file_reads:
+            self.finish_file_reads(wait=True)
         prompt = self.prompt_entry.get("1.0", tk.END).strip()
         if not prompt and not self.uploaded_image_data and not self.history:
             return
 
         self.prompt_entry.delete("1.0", tk.END)
-        self.send_button.config(state=tk.DISABLED) # --- MODIFIED ---
-
-        if prompt or self.uploaded_image_data:
-            user_content_for_history = []
-            if prompt: user_content_for_history.append({"type": "text", "text": prompt})
-            if self.uploaded_image_data: user_content_for_history.append({"type": "image_url", "image_url": {"url": self.uploaded_image_data}})
-            self.history.append({"role": "user", "content": user_content_for_history})
 
-        self.update_chat_display()
+        user_content_for_history = []
+        if prompt: user_content_for_history.append({"type": "text", "text": prompt})
+        if self.uploaded_image_data: user_content_for_history.append({"type": "image_url", "image_url": {"url": self.uploaded_image_data}})
         self.clear_uploaded_image()
 
-        thread = threading.Thread(target=self.call_openrouter_api_with_tool_handling, daemon=True) # --- MODIFIED ---
-        thread.start()
+        if self.request_in_flight:
+            # Enter still works while a reply streams; collect the prompts and send them as one follow-up turn
+            if user_content_for_history:
+                self.queued_content.extend(user_content_for_history)
+                self.append_to_chat_display("[Queued: will be sent when the current reply finishes]\n", "system")
+            return
+
+        if user_content_for_history:
+            self.add_to_history({"role": "user", "content": user_content_for_history})
+        self.start_request()
+
+    def start_request(self):
+        self.request_in_flight = True
+        self.send_button.config(state=tk.DISABLED) # --- MODIFIED ---
+        self.render_new_messages()
+        run_in_background(self.call_openrouter_api_with_tool_handling, report_errors=True)
 
 # --- SUPERIOR / CORRECTED --- New, fully-featured API calling method
     def call_openrouter_api_with_tool_handling(self):
@@ -416,34 +828,44 @@ class LLMQueryWindow(Toplevel):
         model_name = self.config_details.get("model")
 
         if not api_key:
-            self.append_to_chat_display("Error: OpenRouter API Key is missing.", "error")
-            self.send_button.config(state=tk.NORMAL)
+            self.post_to_chat_display("Error: OpenRouter API Key is missing.", "error")
+            self.app.call_in_ui(self.finish_response)
             return
 
-        api_url = "https://openrouter.ai/api/v1/chat/completions"
+        api_url = f"{OPENROUTER_BASE_URL}/chat/completions"
         headers = {'Authorization': f'Bearer {api_key}', 'Content-Type': 'application/json'}
 
-        # Initial request
-        messages = self.history.copy()
-        if self.advanced_settings.get("system_message"):
-            messages.insert(0, {"role": "system", "content": self.advanced_settings["system_message"]})
+        # The request body is assembled from per-message JSON that is encoded once and
+        # reused on later turns; only the messages added since the last send get serialized.
+        system_message = self.advanced_settings.get("system_message")
+        system_prefix = []
+        if system_message:
+            system_content = system_message
+            if model_name and model_name.startswith(CACHE_CONTROL_MODEL_PREFIXES):
+                # The system prompt is identical on every turn, so let the provider serve it from its cache
+                system_content = [{"type": "text", "text": system_message, "cache_control": {"type": "ephemeral"}}]
+            system_prefix.append(json_dumps_bytes({"role": "system", "content": system_content}, indent=False))
 
-        payload = {"model": model_name, "messages": messages}
         try:
-            params = OpenRouterAPIParameters(**self.advanced_settings)
-            payload.update(params.model_dump(exclude_none=True))
+            params = validated_api_params(self.advanced_settings)
         except Exception as e:
-            self.append_to_chat_display(f"Parameter Validation Error: {e}", "error")
-            self.send_button.config(state=tk.NORMAL)
+            self.post_to_chat_display(f"Parameter Validation Error: {e}", "error")
+            self.app.call_in_ui(self.finish_response)
             return
 
+        body_head = b'{"model":' + json_dumps_bytes(model_name, indent=False) + b',"stream":true,"messages":['
+        body_tail = b']'
+        if params:
+            body_tail += b',' + json_dumps_bytes(params, indent=False)[1:-1]
+        body_tail += b'}'
+        # At temperature 0 the same request gets the same answer, so a repeat can skip the network
+        cacheable = params.get('temperature') == 0
+
         try:
             # --- FIRST API CALL ---
-            response = requests.post(api_url, headers=headers, json=payload, timeout=180)
-            response.raise_for_status()
-            result = response.json()
-            message = result['choices'][0]['message']
-            self.history.append(message) # Append the model's response (or tool_call request)
+            body = body_head + b','.join(system_prefix + self.history_window(model_name)) + body_tail
+            message = self.complete(api_url, headers, body, cacheable)
+            self.add_to_history(message) # Append the model's response (or tool_call request)
 
             # --- TOOL CALL HANDLING LOOP ---
             while message.get("tool_calls"):
@@ -451,20 +873,20 @@ class LLMQueryWindow(Toplevel):
                 
                 for tool_call in tool_calls:
                     function_name = tool_call['function']['name']
-                    self.append_to_chat_display(f"--- Calling Tool: {function_name} ---\n", "system")
+                    self.post_to_chat_display(f"--- Calling Tool: {function_name} ---\n", "system")
                     
                     if function_name in self.app.tool_registry:
                         try:
                             function_to_call = self.app.tool_registry[function_name]
-                            function_args = json.loads(tool_call['function']['arguments'])
+                            function_args = json_loads(tool_call['function']['arguments'] or "{}")
                             
                             # Execute the actual Python function
                             function_response = function_to_call(**function_args)
                             
-                            self.append_to_chat_display(f"--- Tool Response: {function_response} ---\n", "system")
+                            self.post_to_chat_display(f"--- Tool Response: {function_response} ---\n", "system")
 
                             # Add the tool response to history for the next API call
-                            self.history.append({
+                            self.add_to_history({
                                 "tool_call_id": tool_call['id'],
                                 "role": "tool",
                                 "name": function_name,
@@ -472,8 +894,8 @@ class LLMQueryWindow(Toplevel):
                             })
                         except Exception as e:
                             error_message = f"Error executing tool '{function_name}': {e}"
-                            self.append_to_chat_display(error_message, "error")
-                            self.history.append({
+                            self.post_to_chat_display(error_message, "error")
+                            self.add_to_history({
                                 "tool_call_id": tool_call['id'],
                                 "role": "tool",
                                 "name": function_name,
@@ -481,8 +903,8 @@ class LLMQueryWindow(Toplevel):
                             })
                     else:
                         error_message = f"Error: Tool '{function_name}' not found in registry."
-                        self.append_to_chat_display(error_message, "error")
-                        self.history.append({
+                        self.post_to_chat_display(error_message, "error")
+                        self.add_to_history({
                             "tool_call_id": tool_call['id'],
                             "role": "tool",
                             "name": function_name,
@@ -490,60 +912,229 @@ class LLMQueryWindow(Toplevel):
                         })
                 
                 # --- SECOND API CALL (with tool results) ---
-                payload['messages'] = self.history
-                response = requests.post(api_url, headers=headers, json=payload, timeout=180)
-                response.raise_for_status()
-                result = response.json()
-                message = result['choices'][0]['message']
-                self.history.append(message) # Append the final natural language response
-            
-            # --- FINAL UPDATE ---
-            #
-            # --- FIX --- Changed self.root to self.app.root
-            self.app.root.after(0, self.update_chat_display)
+                body = body_head + b','.join(system_prefix + self.history_window(model_name)) + body_tail
+                message = self.complete(api_url, headers, body, cacheable)
+                self.add_to_history(message) # Append the final natural language response
 
         except requests.exceptions.RequestException as e:
-            self.append_to_chat_display(f"API Request Failed: {e}", "error")
+            error_msg = f"API Request Failed: {e}"
+            if e.response is not None:
+                # Error bodies are short JSON documents; cap them in case a proxy returns a full page
+                error_msg += f"\n{e.response.text[:ERROR_BODY_PREVIEW_CHARS]}"
+            self.post_to_chat_display(error_msg + "\n", "error")
+        except StreamError as e:
+            self.post_to_chat_display(f"API Request Failed: {e}\n", "error")
+        except (KeyError, IndexError, TypeError, ValueError) as e:
+            self.post_to_chat_display(f"Malformed response from OpenRouter: {e!r}\n", "error")
         except Exception as e:
-            error_msg = f"An unexpected error occurred: {e}\n\nFull Response:\n{getattr(e, 'response', '')}"
-            self.append_to_chat_display(error_msg, "error")
+            self.post_to_chat_display(f"An unexpected error occurred: {e}\n", "error")
         finally:
-            #
-            # --- FIX --- Changed self.root to self.app.root
-            self.app.root.after(0, lambda: self.send_button.config(state=tk.NORMAL))
+            self.app.call_in_ui(self.finish_response)
+
+    def encode_history(self):
+        """Returns the JSON encoding of every history message, encoding only the ones added since the last call."""
+        if len(self.encoded_history) > len(self.history):
+            self.encoded_history = []
+        for item in self.history[len(self.encoded_history):]:
+            self.encoded_history.append(json_dumps_bytes(item, indent=False))
+        return self.encoded_history
+
+    def context_bytes(self, item, item_json):
+        """Estimates a message's share of the context in JSON bytes, counting images as IMAGE_TOKEN_ESTIMATE tokens each."""
+        size = len(item_json)
+        content = item.get('content')
+        if isinstance(content, list):
+            for part in content:
+                if part.get('type') == 'image_url':
+                    # A data URL's base64 length says nothing about the tokens the image costs
+                    size += self.IMAGE_TOKEN_ESTIMATE * self.BYTES_PER_TOKEN - len(part['image_url']['url'])
+        return size
+
+    def history_window(self, model_name):
+        """Returns the encoded messages to send: the last max_history_turns turns, fewer if they would overflow the model's context."""
+        encoded = self.encode_history()
+        # Cut only at a user message so a tool call is never separated from its results
+        turn_starts = [index for index, item in enumerate(self.history) if item.get('role') == 'user']
+        start = 0
+        max_turns = self.advanced_settings.get("max_history_turns", self.MAX_HISTORY_TURNS)
+        if max_turns and len(turn_starts) > max_turns:
+            start = turn_starts[-max_turns]
+        context_length = self.app.models_by_id.get(model_name, {}).get('context_length')
+        if context_length:
+            budget = context_length * self.BYTES_PER_TOKEN
+            sizes = [self.context_bytes(item, item_json) for item, item_json in zip(self.history, encoded)]
+            total = sum(sizes[start:])
+            for turn_start in turn_starts:
+                if total <= budget:
+                    break
+                if turn_start > start:
+                    total -= sum(sizes[start:turn_start])
+                    start = turn_start
+        if start == 0:
+            return encoded
+        note = json_dumps_bytes({"role": "system", "content": "Earlier messages in this conversation were omitted."}, indent=False)
+        return [note] + encoded[start:]
+
+    def complete(self, api_url, headers, body, cacheable=False):
+        """Like stream_completion, but answers a cacheable request seen before from the response cache."""
+        if not cacheable:
+            return self.stream_completion(api_url, headers, body)
+        key = hashlib.blake2b(body, digest_size=16).digest()
+        content = _response_cache.get(key)
+        if content is not None:
+            self.post_to_chat_display("Assistant: ", "assistant_role")
+            self.post_to_chat_display(f"{content}\n\n")
+            return {"role": "assistant", "content": content}
+        message = self.stream_completion(api_url, headers, body)
+        # Tool calls must run again, and a reply cut short by closing the window is incomplete
+        if message['content'] and 'tool_calls' not in message and not self.closing.is_set():
+            _response_cache.put(key, message['content'])
+        return message
+
+    def stream_completion(self, api_url, headers, body):
+        """Posts a streaming request, echoes text deltas to the chat as they arrive
+        and returns the assembled assistant message (including any tool calls)."""
+        message = {"role": "assistant", "content": ""}
+        tool_calls = {}
+        with _SESSION.post(api_url, headers=headers, data=body, stream=True, timeout=180) as response:
+            if not response.ok:
+                response.content # Read the error body while the stream is still open
+            response.raise_for_status()
+            for chunk in iter_sse_chunks(response):
+                if self.closing.is_set():
+                    # Window closed mid-reply: leaving the block closes the stream and ends generation
+                    return message
+                if 'error' in chunk:
+                    error = chunk['error']
+                    raise StreamError(error.get('message', error) if isinstance(error, dict) else error)
+                choices = chunk.get('choices')
+                if not choices:
+                    continue
+                delta = choices[0].get('delta') or {}
+
+                text = delta.get('content')
+                if text:
+                    if not message['content']:
+                        self.post_to_chat_display("Assistant: ", "assistant_role")
+                    message['content'] += text
+                    self.post_to_chat_display(text)
+
+                # Tool calls arrive in fragments keyed by index; stitch them back together
+                for fragment in delta.get('tool_calls') or []:
+                    tool_call = tool_calls.setdefault(fragment.get('index', 0), {
+                        "id": None,
+                        "type": "function",
+                        "function": {"name": "", "arguments": ""},
+                    })
+                    if fragment.get('id'):
+                        tool_call['id'] = fragment['id']
+                    function = fragment.get('function') or {}
+                    tool_call['function']['name'] += function.get('name') or ""
+                    tool_call['function']['arguments'] += function.get('arguments') or ""
+
+        if message['content']:
+            self.post_to_chat_display("\n\n")
+        if tool_calls:
+            message['tool_calls'] = [tool_calls[index] for index in sorted(tool_calls)]
+        return message
+
+    def post_to_chat_display(self, text, tag=None):
+        """Thread-safe append: schedules the insert on the Tk main loop."""
+        if self.closing.is_set():
+            return
+        with self.chat_backlog_lock:
+            flush_pending = bool(self.chat_backlog)
+            self.chat_backlog += (text, tag or "")
+        # Deltas that arrive before the UI gets round to it share one insert
+        if not flush_pending:
+            self.app.call_in_ui(self.flush_chat_backlog)
+
+    def flush_chat_backlog(self):
+        with self.chat_backlog_lock:
+            segments, self.chat_backlog = self.chat_backlog, []
+        if segments:
+            self.insert_chat_segments(segments)
+
+    def enable_send_button(self):
+        self.send_button.config(state=tk.NORMAL)
+
+    def finish_response(self):
+        if self.closing.is_set():
+            return
+        # The assistant's replies were streamed into the display as they arrived
+        self.rendered_count = len(self.history)
+        self.request_in_flight = False
+        if self.queued_content:
+            self.add_to_history({"role": "user", "content": self.queued_content})
+            self.queued_content = []
+            self.start_request()
+        else:
+            self.enable_send_button()
+
+    @staticmethod
+    def chat_segments(item):
+        """Yields the (text, tag) pairs that show one history message in the chat display."""
+        role = item.get('role')
+        content = item.get('content')
+
+        # Message text and its line breaks go in as separate pairs: render_new_messages inserts
+        # them all in one call anyway, and long messages aren't copied just to append a newline
+        if role == 'user':
+            yield "You: ", "user_role"
+            if isinstance(content, list):
+                for part in content:
+                    if part['type'] == 'text':
+                        yield part['text'], ""
+                        yield "\n", ""
+                    elif part['type'] == 'image_url': yield "[Image]\n", "system"
+            else:
+                yield str(content), ""
+                yield "\n", ""
+        elif role == 'assistant':
+            # --- MODIFIED --- To handle tool calls which have null content
+            if content:
+                yield "Assistant: ", "assistant_role"
+                yield content, ""
+                yield "\n\n", ""
+        # We don't display tool/system messages directly as they are handled by the system tags
 
     def update_chat_display(self):
-        self.chat_display.config(state=tk.NORMAL)
-        self.chat_display.delete("1.0", tk.END)
-        for item in self.history:
-            role = item.get('role')
-            content = item.get('content')
-
-            if role == 'user':
-                self.append_to_chat_display("You: ", "user_role")
-                if isinstance(content, list):
-                    for part in content:
-                        if part['type'] == 'text': self.append_to_chat_display(f"{part['text']}\n")
-                        elif part['type'] == 'image_url': self.append_to_chat_display("[Image]\n", "system")
-                else: self.append_to_chat_display(f"{content}\n")
-            elif role == 'assistant':
-                # --- MODIFIED --- To handle tool calls which have null content
-                if content:
-                    self.append_to_chat_display("Assistant: ", "assistant_role")
-                    self.append_to_chat_display(f"{content}\n\n")
-            # We don't display tool/system messages directly as they are handled by the system tags
-        self.chat_display.config(state=tk.DISABLED)
+        """Redraws the whole conversation; new messages are added with render_new_messages."""
+        with self.editable_chat():
+            self.chat_display.delete("1.0", tk.END)
+        self.chat_text = StringIO()
+        self.rendered_count = 0
+        self.render_new_messages()
+
+    def render_new_messages(self):
+        """Appends the history messages not yet shown, leaving the existing text in place."""
+        segments = []
+        for item in self.history[self.rendered_count:]:
+            for text, tag in self.chat_segments(item):
+                segments += (text, tag)
+        self.rendered_count = len(self.history)
+        if segments:
+            self.insert_chat_segments(segments)
+
+    def insert_chat_segments(self, segments):
+        """Appends a flat list of text/tag pairs to the chat display and its plain-text copy."""
+        # Text.insert accepts several text/tag pairs, so a whole batch goes in with one call
+        with self.editable_chat():
+            self.chat_display.insert(tk.END, *segments)
         self.chat_display.see(tk.END)
+        self.chat_text.writelines(segments[::2])
 
-    def append_to_chat_display(self, text, tag=None):
+    @contextmanager
+    def editable_chat(self):
+        """Unlocks the read-only chat display for the duration of a batch of edits."""
         self.chat_display.config(state=tk.NORMAL)
-        self.chat_display.tag_configure("user_role", font=("Arial", 11, "bold"))
-        self.chat_display.tag_configure("assistant_role", font=("Arial", 11, "bold"), foreground="blue")
-        self.chat_display.tag_configure("system", font=("Arial", 9, "italic"), foreground="gray")
-        self.chat_display.tag_configure("error", font=("Arial", 10, "italic"), foreground="red")
-        self.chat_display.insert(tk.END, text, tag)
-        self.chat_display.config(state=tk.DISABLED)
-        self.chat_display.see(tk.END)
+        try:
+            yield
+        finally:
+            self.chat_display.config(state=tk.DISABLED)
+
+    def append_to_chat_display(self, text, tag=None):
+        self.insert_chat_segments((text, tag or ""))
 
 
 class UseFileWindow(Toplevel):
@@ -576,8 +1167,7 @@ class UseFileWindow(Toplevel):
         self.files_tree.configure(yscroll=scrollbar.set)
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
 
-        for i, item in enumerate(self.app.files):
-            self.files_tree.insert('', tk.END, iid=i, values=(item['filename'], item['type'], item['date_added']))
+        fill_treeview_in_chunks(self.files_tree, self.app.file_rows.items())
 
         use_button = ttk.Button(main_frame, text="Use Selected File", command=self.use_selected)
         use_button.pack()
@@ -588,8 +1178,9 @@ class UseFileWindow(Toplevel):
             messagebox.showwarning("Selection Error", "Please select a file to use.", parent=self)
             return
 
-        item_index = int(selected_iid)
-        file_info = self.app.files[item_index]
+        file_info = self.app.files.get(selected_iid)
+        if file_info is None:
+            return # Deleted from the Files tab while this window was open
         self.parent.add_file_context_to_chat(file_info)
         self.destroy()
 
@@ -633,10 +1224,10 @@ class SelectToolsWindow(Toplevel):
 
         for tool in self.app.tools:
             var = tk.BooleanVar()
-            tool_name = tool.get('function', {}).get('name', 'Unnamed Tool')
-            chk = ttk.Checkbutton(self.scrollable_frame, text=tool_name, variable=var)
+            tool_name = tool.get('function', {}).get('name')
+            chk = ttk.Checkbutton(self.scrollable_frame, text=tool_name or 'Unnamed Tool', variable=var)
             chk.pack(anchor="w", padx=10, pady=5)
-            self.tool_vars.append((var, tool))
+            self.tool_vars.append((var, tool, tool_name))
 
         canvas.pack(side="left", fill="both", expand=True)
         scrollbar.pack(side="right", fill="y")
@@ -649,31 +1240,33 @@ class SelectToolsWindow(Toplevel):
 
     def load_current_tools(self):
         try:
-            current_tools_str = self.tools_text_widget.get("1.0", tk.END).strip()
-            if not current_tools_str:
-                return
-            current_tools_data = json.loads(current_tools_str)
-            if not isinstance(current_tools_data, list):
-                return
-            current_tool_names = {t.get('function', {}).get('name') for t in current_tools_data}
+            current_tool_names = self.app.selected_tool_names
+            # Tk sets the modified flag on any edit, typed or loaded from a profile; until then
+            # the field still holds what Apply wrote, so its JSON needn't be fetched and parsed
+            if current_tool_names is None or self.tools_text_widget.edit_modified():
+                current_tools_str = self.tools_text_widget.get("1.0", tk.END).strip()
+                if not current_tools_str:
+                    return
+                current_tools_data = json_loads(current_tools_str)
+                if not isinstance(current_tools_data, list):
+                    return
+                current_tool_names = {t.get('function', {}).get('name') for t in current_tools_data}
 
-            for var, tool in self.tool_vars:
-                tool_name = tool.get('function', {}).get('name')
+            for var, tool, tool_name in self.tool_vars:
                 if tool_name in current_tool_names:
                     var.set(True)
         except (json.JSONDecodeError, AttributeError):
             pass # Ignore errors in parsing existing content
 
     def apply_selection(self):
-        selected_tools = []
-        for var, tool in self.tool_vars:
-            if var.get():
-                selected_tools.append(tool)
+        selected = [(tool, tool_name) for var, tool, tool_name in self.tool_vars if var.get()]
 
         self.tools_text_widget.delete("1.0", tk.END)
-        if selected_tools:
+        if selected:
             # Pretty-print JSON into the Text widget
-            self.tools_text_widget.insert("1.0", json.dumps(selected_tools, indent=4))
+            self.tools_text_widget.insert("1.0", json_dumps_text([tool for tool, _ in selected]))
+        self.app.selected_tool_names = frozenset(tool_name for _, tool_name in selected)
+        self.tools_text_widget.edit_modified(False)
 
         self.destroy()
 
@@ -691,7 +1284,7 @@ def get_weather(location: str):
 
 def get_current_datetime():
     """Returns the current date and time."""
-    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    return datetime.now().isoformat(" ", "seconds")
 
 def get_stock_price(symbol: str):
     """Fetches the mock stock price for a given symbol."""
@@ -705,24 +1298,59 @@ def get_stock_price(symbol: str):
 class DesktopUtilitiesApp:
     CONFIG_FILE = "config.json"
     FILES_DIR = "saved_files"
-
-    def __init__(self, root):
+    SAVED_ITEMS_FILE = "saved_items.jsonl"
+    MODELS_CACHE_FILE = "models_cache.json"
+    MODELS_ETAG_FILE = "models_cache.etag"
+    AUTOSAVE_DELAY_MS = 2000 # Edits are written to config.json this long after the last one
+    MODELS_CACHE_TTL = 24 * 60 * 60 # Seconds before the cached catalog is revalidated on startup
+    SAVED_ITEMS_PAGE_SIZE = 200 # Saved item rows added to the tree at a time as the user scrolls
+    KEY_BUFFER_LIMIT = 64 # Typed characters kept for trigger matching, unless a trigger is longer
+
+    def __init__(self, root, config_future=None):
         self.root = root
         self.root.title("Desktop Utilities")
         self.root.geometry("950x800") # Increased window size
 
         self.shortcuts = {}
         self.llm_configs = {}
+        self.config_names_by_model = {}
         self.llm_profiles = {}
+        self.profile_names = []
         self.saved_items = []
-        self.files = []
+        self.files = {} # Keyed by filename, which is unique within FILES_DIR
+        self.file_rows = {} # Treeview values for each file, in the same order, shared by every file list
         self.tools = []
+        self.tools_by_name = {}
+        self.tools_by_iid = {} # Tools tab row id -> tool
+        self.selected_tool_names = None # Names last applied by SelectToolsWindow to the profile's Tools field
+        self.file_context_cache = LRUCache(FILE_CONTEXT_CACHE_SIZE) # (path, mtime_ns, size) -> text, filled from worker threads
+        self.image_cache = LRUCache(IMAGE_CACHE_SIZE) # (path, mtime_ns, size) -> data URL, filled from worker threads
+        # Saved item rows get ids that stay valid when other rows are removed
+        self.row_ids = itertools.count()
+        self.saved_items_by_iid = {}
+        self.saved_item_ids = itertools.count()
+        # Set when SAVED_ITEMS_FILE failed to load; it is then left untouched rather than appended to
+        self.saved_items_file_failed = False
+        self.pending_copies = 0
         self.open_query_windows = {}
-        self.openrouter_models = []
+        self.openrouter_models = ()
         self.models_data = []
+        self.models_by_id = {}
+        self.supported_params_by_id = {}
+        self.config_future = config_future
+
+        # Start downloading the model catalog right away so it overlaps with building the UI,
+        # unless the copy cached on disk is still fresh
+        if self.models_cache_is_fresh():
+            self.models_future = None
+            run_in_background(warm_up_connection, report_errors=True)
+        else:
+            self.models_future = run_in_background(self.fetch_openrouter_models)
 
-        self.buffer = ""
-        self.keyboard_controller = keyboard.Controller()
+        self.shortcut_trie = {}
+        self.buffer_limit = self.KEY_BUFFER_LIMIT
+        self.buffer = deque(maxlen=self.buffer_limit) # Recently typed characters; old ones fall off the front
+        self.expansion_lock = threading.Lock()
 
         # --- NEW --- The Tool Registry
         # Maps tool names from your UI to actual Python functions
@@ -733,37 +1361,186 @@ class DesktopUtilitiesApp:
             # Add other functions here as you create them
         }
 
-        self.setup_directories()
-        self.load_data()
+        # The window is drawn with empty lists first; stored data is read on background
+        # threads and applied once it arrives
+        self.data_loaded = False
+        self.pending_ui = {}
+        self.ui_calls = queue.SimpleQueue()
+        self.ui_drain_scheduled = False
+        self.saved_config_digest = None
+        self.autosave_after_id = None
+        run_in_background(self.setup_directories, report_errors=True)
         self.create_widgets()
         self.start_listener()
+        self.load_data()
 
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
 
+    @functools.cached_property
+    def keyboard_controller(self):
+        """Created on the first shortcut expansion instead of at startup."""
+        return keyboard.Controller()
+
     def setup_directories(self):
-        if not os.path.exists(self.FILES_DIR):
-            os.makedirs(self.FILES_DIR)
+        os.makedirs(self.FILES_DIR, exist_ok=True)
 
     def load_data(self):
-        if os.path.exists(self.CONFIG_FILE):
+        """Reads config.json and the saved items off the Tk thread; apply_loaded_data runs on it."""
+        config_future = self.config_future or run_in_background(read_config_file, self.CONFIG_FILE)
+        self.config_future = None
+        saved_items_future = run_in_background(read_json_lines_file, self.SAVED_ITEMS_FILE)
+
+        def on_read(_):
+            if config_future.done() and saved_items_future.done():
+                self.call_in_ui(self.apply_loaded_data, config_future, saved_items_future)
+
+        config_future.add_done_callback(on_read)
+        saved_items_future.add_done_callback(on_read)
+
+    def apply_loaded_data(self, config_future, saved_items_future):
+        if self.data_loaded:
+            return
+
+        # Everything is parsed into locals first, so a config that fails part-way leaves no half-applied state
+        can_save = True
+        try:
+            data = config_future.result()
+            if data:
+                shortcuts = {
+                    trigger: self.make_shortcut(trigger, details["output"], details.get("enabled", True))
+                    for trigger, details in data.get("shortcuts", {}).items()
+                }
+                llm_configs = data.get("llm_configs", {})
+                if not all(isinstance(config, dict) for config in llm_configs.values()):
+                    raise TypeError("LLM configs must be JSON objects")
+                llm_profiles = data.get("llm_profiles", {})
+                profile_names = sorted(llm_profiles)
+                # Older configs kept saved items inline; they are migrated to SAVED_ITEMS_FILE below
+                saved_items = list(data.get("saved_items", []))
+                files = {f['filename']: f for f in data.get("files", [])}
+                file_rows = {name: self.file_row(f) for name, f in files.items()}
+                tools = data.get("tools", [])
+                tools_by_name = {t['function']['name']: t for t in tools if t.get('function', {}).get('name')}
+        except OSError as e:
+            # Possibly transient: keep saving off so the stored config is not replaced with an empty one
+            can_save = False
+            data = None
+            messagebox.showerror("Config Error", f"Failed to read config.json: {e}\n\nChanges made this session will not be saved.")
+        except (ValueError, KeyError, TypeError, AttributeError):
+            # Bad JSON or the wrong shape (a top-level array, entries missing keys): move it aside before saving over it
+            data = None
+            bad_path = f"{self.CONFIG_FILE}.bad"
             try:
-                with open(self.CONFIG_FILE, 'r') as f:
-                    data = json.load(f)
-                    shortcuts_data = data.get("shortcuts", {})
-                    for trigger, details in shortcuts_data.items():
-                        self.shortcuts[trigger] = {
-                            "output": details["output"],
-                            "enabled": tk.BooleanVar(value=details.get("enabled", True))
-                        }
-                    self.llm_configs = data.get("llm_configs", {})
-                    self.llm_profiles = data.get("llm_profiles", {})
-                    self.saved_items = data.get("saved_items", [])
-                    self.files = data.get("files", [])
-                    self.tools = data.get("tools", [])
-            except json.JSONDecodeError:
-                messagebox.showerror("Config Error", "Failed to load config.json. It might be corrupted.")
+                os.replace(self.CONFIG_FILE, bad_path)
+                messagebox.showerror("Config Error", f"Failed to load config.json. It might be corrupted; it was moved to {bad_path}.")
+            except OSError:
+                can_save = False
+                messagebox.showerror("Config Error", "Failed to load config.json. It might be corrupted.\n\nChanges made this session will not be saved.")
+        else:
+            if data:
+                self.shortcuts.update(shortcuts)
+                self.llm_configs = llm_configs
+                self.index_llm_configs()
+                self.llm_profiles = llm_profiles
+                self.profile_names = profile_names
+                self.saved_items = saved_items
+                self.files = files
+                self.file_rows = file_rows
+                self.tools = tools
+                self.tools_by_name = tools_by_name
+        try:
+            self.apply_saved_items(saved_items_future)
+            self.build_shortcut_trie()
+        finally:
+            self.data_loaded = can_save
+        # Configs still holding inline saved items are rewritten once to drop them
+        if data and "saved_items" not in data:
+            self.saved_config_digest = self.serialize_config()[1]
+
+        self.schedule_ui(self.update_shortcut_list_ui)
+        self.schedule_ui(self.update_llm_list_ui)
+        # Lazily built tabs pick the data up when created; refresh any that already exist
+        if hasattr(self, 'profiles_tree'):
+            self.schedule_ui(self.update_llm_profiles_ui)
+        if hasattr(self, 'tools_tree'):
+            self.schedule_ui(self.update_tools_ui)
+        if hasattr(self, 'saved_items_tree'):
+            self.schedule_ui(self.update_saved_items_ui)
+        if hasattr(self, 'files_tree_view'):
+            self.schedule_ui(self.update_files_ui)
+
+    def apply_saved_items(self, saved_items_future):
+        """Applies saved prompts/responses read from their own JSON Lines file, one item per line.
+
+        Deletions are appended as {"_deleted": id} lines and replayed in order here; a file
+        holding any of them, or items from before ids were added, is compacted once on load.
+        """
+        try:
+            saved_items = saved_items_future.result()
+        except (OSError, ValueError):
+            self.saved_items_file_failed = True
+            messagebox.showerror("Config Error", f"Failed to load {self.SAVED_ITEMS_FILE}. It might be corrupted. "
+                                 "Saved items changed this session will not be written to it.")
+            return
+        if saved_items is None:
+            if self.saved_items:
+                self.assign_saved_item_ids(self.saved_items)
+                self.rewrite_saved_items_file()
+            return
+        items = []
+        deletions = 0
+        for entry in saved_items:
+            if "_deleted" in entry:
+                deletions += 1
+                deleted = entry["_deleted"]
+                if isinstance(deleted, int):
+                    # Tombstone from before ids were added, indexing the items replayed so far
+                    if 0 <= deleted < len(items):
+                        del items[deleted]
+                else:
+                    items = [item for item in items if item.get("id") != deleted]
+            else:
+                items.append(entry)
+        self.saved_items = items
+        if self.assign_saved_item_ids(items) or deletions:
+            self.rewrite_saved_items_file()
+
+    def new_saved_item_id(self):
+        return f"{time.time_ns():x}-{next(self.saved_item_ids)}"
+
+    def assign_saved_item_ids(self, items):
+        """Gives items saved before ids were added one; returns whether any needed it."""
+        missing = [item for item in items if "id" not in item]
+        for item in missing:
+            item["id"] = self.new_saved_item_id()
+        return bool(missing)
+
+    def append_saved_item_to_file(self, item):
+        if self.saved_items_file_failed:
+            return
+        record = json_dumps_bytes(item, indent=False) + b"\n"
+        with open(self.SAVED_ITEMS_FILE, 'a+b') as f:
+            # Start on a fresh line if an earlier append was cut short
+            if f.tell():
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    record = b"\n" + record
+            f.write(record)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def delete_saved_item(self, item):
+        self.saved_items = [saved for saved in self.saved_items if saved is not item]
+        if "id" in item:
+            self.append_saved_item_to_file({"_deleted": item["id"]})
+
+    def rewrite_saved_items_file(self):
+        if self.saved_items_file_failed:
+            return
+        data = b"".join(json_dumps_bytes(item, indent=False) + b"\n" for item in self.saved_items)
+        write_file_atomic(self.SAVED_ITEMS_FILE, data)
 
-    def save_data(self):
+    def config_data(self):
         shortcuts_to_save = {
             trigger: {"output": details["output"], "enabled": details["enabled"].get()}
             for trigger, details in self.shortcuts.items()
@@ -772,14 +1549,37 @@ class DesktopUtilitiesApp:
             "shortcuts": shortcuts_to_save,
             "llm_configs": self.llm_configs,
             "llm_profiles": self.llm_profiles,
-            "saved_items": self.saved_items,
-            "files": self.files,
+            "files": list(self.files.values()),
             "tools": self.tools
         }
-        with open(self.CONFIG_FILE, 'w') as f:
-            json.dump(data, f, indent=4)
+        return data
+
+    def serialize_config(self):
+        """Returns the config file bytes and a digest used to skip rewriting an unchanged config."""
+        blob = json_dumps_bytes(self.config_data())
+        return blob, hashlib.blake2b(blob, digest_size=16).digest()
+
+    def save_data(self):
+        if not self.data_loaded:
+            return # Never overwrite the stored config with the empty startup state
+        blob, digest = self.serialize_config()
+        if digest == self.saved_config_digest:
+            return # Nothing changed since the config was loaded or last written
+        write_file_atomic(self.CONFIG_FILE, blob)
+        self.saved_config_digest = digest
+
+    def schedule_save(self):
+        """Saves the config shortly after an edit; a burst of edits is written once."""
+        if self.autosave_after_id is not None:
+            self.root.after_cancel(self.autosave_after_id)
+        self.autosave_after_id = self.root.after(self.AUTOSAVE_DELAY_MS, self.autosave)
+
+    def autosave(self):
+        self.autosave_after_id = None
+        self.save_data()
 
     def on_closing(self):
+        self.listener.stop()
         self.save_data()
         self.root.destroy()
 
@@ -803,10 +1603,68 @@ class DesktopUtilitiesApp:
 
         self.create_shortcut_tab(shortcut_tab)
         self.create_llm_tab(llm_tab)
-        self.create_config_profiles_tab(profiles_tab)
-        self.create_tools_tab(tools_tab)
-        self.create_saved_items_tab(saved_items_tab)
-        self.create_files_tab(files_tab)
+
+        # The remaining tabs are only built the first time they are shown
+        self.lazy_tabs = {
+            str(profiles_tab): (self.create_config_profiles_tab, profiles_tab),
+            str(tools_tab): (self.create_tools_tab, tools_tab),
+            str(saved_items_tab): (self.create_saved_items_tab, saved_items_tab),
+            str(files_tab): (self.create_files_tab, files_tab),
+        }
+        notebook.bind("<<NotebookTabChanged>>", self.on_tab_changed)
+
+    def call_in_ui(self, func, *args):
+        """Runs func(*args) on the Tk thread; safe to call from any thread.
+
+        Calls queued before Tk gets to them are run together from a single after() callback.
+        """
+        self.ui_calls.put((func, args))
+        # Checked after the put, so a drain that already started either sees the call or leaves this flag clear
+        if not self.ui_drain_scheduled:
+            self.ui_drain_scheduled = True
+            try:
+                self.root.after(0, self.drain_ui_calls)
+            except (RuntimeError, tk.TclError):
+                # Main loop not running (yet, or any more): let the next call try to schedule the drain again
+                self.ui_drain_scheduled = False
+                raise
+
+    def drain_ui_calls(self):
+        self.ui_drain_scheduled = False
+        while True:
+            try:
+                func, args = self.ui_calls.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                func(*args)
+            except Exception:
+                # Report like Tk would for an after() callback, without dropping the calls behind it
+                self.root.report_callback_exception(*sys.exc_info())
+
+    def schedule_ui(self, update):
+        """Runs an update_*_ui method once when Tk is next idle, however often it was requested.
+
+        These full rebuilds are only for loads and refreshes; adding, editing or deleting a single
+        item touches just its own row.
+        """
+        if not self.pending_ui:
+            self.root.after_idle(self.flush_ui)
+        self.pending_ui[update] = None
+
+    def flush_ui(self):
+        pending, self.pending_ui = self.pending_ui, {}
+        for update in pending:
+            update()
+
+    def on_tab_changed(self, event):
+        pending = self.lazy_tabs.pop(event.widget.select(), None)
+        if pending:
+            create_tab, tab_frame = pending
+            create_tab(tab_frame)
+            if not self.lazy_tabs:
+                # Every tab exists now; later tab switches have nothing to build
+                event.widget.unbind("<<NotebookTabChanged>>")
 
     def create_shortcut_tab(self, parent):
         main_frame = ttk.Frame(parent, padding="10")
@@ -834,25 +1692,84 @@ class DesktopUtilitiesApp:
         if trigger in self.shortcuts:
             messagebox.showerror("Duplicate Error", f"The trigger '{trigger}' already exists.")
             return
-        self.shortcuts[trigger] = {"output": output, "enabled": tk.BooleanVar(value=True)}
+        self.shortcuts[trigger] = self.make_shortcut(trigger, output)
         self.trigger_entry.delete(0, tk.END)
         self.output_entry.delete(0, tk.END)
-        self.update_shortcut_list_ui()
+        self.add_shortcut_row(trigger, self.shortcuts[trigger])
+        self.build_shortcut_trie()
+        self.schedule_save()
+
+    def build_shortcut_trie(self):
+        """Indexes the triggers by their reversed characters so a keystroke is matched by walking the buffer backwards."""
+        trie = {}
+        for trigger, shortcut in self.shortcuts.items():
+            node = trie
+            for char in reversed(trigger):
+                node = node.setdefault(char, {})
+            # The shortcut dict rides along so a match needs no second lookup in self.shortcuts
+            node[None] = (trigger, shortcut)
+        # Swapped in whole so the listener thread never sees a half-built trie
+        self.shortcut_trie = trie
+        self.buffer_limit = max([self.KEY_BUFFER_LIMIT] + [len(trigger) for trigger in self.shortcuts])
+
+    def match_shortcut(self):
+        """Returns (trigger, shortcut) for the longest enabled trigger the buffer ends with, or None."""
+        node, match = self.shortcut_trie, None
+        for char in reversed(self.buffer):
+            node = node.get(char)
+            if node is None:
+                break
+            leaf = node.get(None)
+            if leaf is not None and leaf[1]["is_enabled"]:
+                match = leaf
+        return match
 
     def update_shortcut_list_ui(self):
+        """Rebuilds every shortcut row."""
         for widget in self.shortcut_list_frame.winfo_children():
             widget.destroy()
-        for i, (trigger, data) in enumerate(self.shortcuts.items()):
-            ttk.Checkbutton(self.shortcut_list_frame, variable=data["enabled"]).grid(row=i, column=0, padx=5, sticky="w")
-            label_text = f"'{trigger}' -> '{data['output'][:30]}...'" if len(data['output']) > 30 else f"'{trigger}' -> '{data['output']}'"
-            ttk.Label(self.shortcut_list_frame, text=label_text).grid(row=i, column=1, padx=5, sticky="w")
-            ttk.Button(self.shortcut_list_frame, text="Delete", command=lambda t=trigger: self.delete_shortcut(t)).grid(row=i, column=2, padx=5, sticky="e")
+        self.shortcut_rows = {}
+        for trigger, data in self.shortcuts.items():
+            self.add_shortcut_row(trigger, data)
         self.shortcut_list_frame.columnconfigure(1, weight=1)
 
+    def make_shortcut(self, trigger, output, enabled=True):
+        data = {"output": output, "enabled": tk.BooleanVar(value=enabled), "is_enabled": enabled, "label": self.shortcut_label(trigger, output)}
+        # The listener thread reads the plain bool instead of calling into Tcl for the BooleanVar
+        data["enabled"].trace_add("write", functools.partial(self.on_shortcut_toggled, data))
+        return data
+
+    def on_shortcut_toggled(self, data, *trace_args):
+        data["is_enabled"] = data["enabled"].get()
+        self.schedule_save()
+
+    @staticmethod
+    def shortcut_label(trigger, output):
+        """Builds the list text for a shortcut; it is stored with the shortcut but never saved."""
+        return f"'{trigger}' -> '{output[:30]}...'" if len(output) > 30 else f"'{trigger}' -> '{output}'"
+
+    def add_shortcut_row(self, trigger, data):
+        row = len(self.shortcut_rows)
+        check = ttk.Checkbutton(self.shortcut_list_frame, variable=data["enabled"])
+        check.grid(row=row, column=0, padx=5, sticky="w")
+        label = ttk.Label(self.shortcut_list_frame, text=data["label"])
+        label.grid(row=row, column=1, padx=5, sticky="w")
+        button = ttk.Button(self.shortcut_list_frame, text="Delete", command=functools.partial(self.delete_shortcut, trigger))
+        button.grid(row=row, column=2, padx=5, sticky="e")
+        self.shortcut_rows[trigger] = (check, label, button)
+
     def delete_shortcut(self, trigger):
-        if trigger in self.shortcuts:
-            del self.shortcuts[trigger]
-            self.update_shortcut_list_ui()
+        if self.shortcuts.pop(trigger, None) is not None:
+            self.build_shortcut_trie()
+            self.schedule_save()
+            removed_row = list(self.shortcut_rows).index(trigger)
+            for widget in self.shortcut_rows.pop(trigger):
+                widget.destroy()
+            # Close the gap left by the removed row; the rows above it keep their place
+            later_rows = itertools.islice(self.shortcut_rows.values(), removed_row, None)
+            for row, widgets in enumerate(later_rows, removed_row):
+                for widget in widgets:
+                    widget.grid_configure(row=row)
 
     def create_llm_tab(self, parent):
         main_frame = ttk.Frame(parent, padding="10")
@@ -872,34 +1789,156 @@ class DesktopUtilitiesApp:
         refresh_button = ttk.Button(input_frame, text="Refresh Models", command=self.fetch_openrouter_models_threaded)
         refresh_button.grid(row=2, column=2, padx=5)
         ttk.Button(input_frame, text="Save Configuration", command=self.add_llm_config).grid(row=3, column=1, padx=5, pady=10, sticky="e")
-        self.llm_list_frame = ttk.LabelFrame(main_frame, text="Your LLM Model Configurations", padding="10")
-        self.llm_list_frame.pack(fill=tk.BOTH, expand=True, pady=5)
+        list_frame = ttk.LabelFrame(main_frame, text="Your LLM Model Configurations", padding="10")
+        list_frame.pack(fill=tk.BOTH, expand=True, pady=5)
+        tree_frame = ttk.Frame(list_frame)
+        tree_frame.pack(fill=tk.BOTH, expand=True)
+        columns = ('name', 'model', 'trigger')
+        self.llm_tree = ttk.Treeview(tree_frame, columns=columns, show='headings')
+        self.llm_tree.heading('name', text='Config Name')
+        self.llm_tree.heading('model', text='Model')
+        self.llm_tree.heading('trigger', text='Trigger')
+        self.llm_tree.column('name', width=200, anchor=tk.W)
+        self.llm_tree.column('model', width=300, anchor=tk.W)
+        self.llm_tree.column('trigger', width=80, anchor=tk.W)
+        self.llm_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.llm_tree.bind('<Double-1>', lambda e: self.query_selected_llm_config())
+        scrollbar = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL, command=self.llm_tree.yview)
+        self.llm_tree.configure(yscroll=scrollbar.set)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        action_frame = ttk.Frame(list_frame, padding=(0, 10, 0, 0))
+        action_frame.pack(fill=tk.X)
+        ttk.Button(action_frame, text="Query", command=self.query_selected_llm_config).pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Button(action_frame, text="Delete Selected", command=self.delete_selected_llm_config).pack(side=tk.LEFT)
         self.update_llm_list_ui()
-        self.fetch_openrouter_models_threaded()
+        self.load_initial_models()
 
-    def fetch_openrouter_models_threaded(self):
-        self.llm_model_combo.set("Fetching models...")
-        thread = threading.Thread(target=self.fetch_openrouter_models, daemon=True)
-        thread.start()
+    def load_initial_models(self):
+        """Shows the cached catalog immediately and revalidates it in the background when stale."""
+        cached_models = self.read_models_cache()
+        if not cached_models:
+            self.fetch_openrouter_models_threaded()
+            return
+        self.on_models_fetched(cached_models, None)
+        if self.models_future is not None:
+            self.fetch_openrouter_models_threaded(show_progress=False)
+
+    def models_cache_is_fresh(self):
+        try:
+            return time.time() - os.path.getmtime(self.MODELS_CACHE_FILE) < self.MODELS_CACHE_TTL
+        except OSError:
+            return False
+
+    def read_models_cache(self):
+        try:
+            with open(self.MODELS_CACHE_FILE, 'rb') as f:
+                return json_loads(f.read())['data']
+        except (OSError, ValueError, KeyError):
+            return []
+
+    def fetch_openrouter_models_threaded(self, show_progress=True):
+        if show_progress:
+            self.llm_model_combo.set("Fetching models...")
+        # The first call picks up the fetch started in __init__; later refreshes start a new one
+        future = self.models_future or run_in_background(self.fetch_openrouter_models)
+        self.models_future = None
+        future.add_done_callback(lambda f: self.call_in_ui(self.on_models_fetched, *f.result()))
+
+    def read_models_etag(self):
+        if not os.path.exists(self.MODELS_CACHE_FILE):
+            return None
+        try:
+            with open(self.MODELS_ETAG_FILE, 'r') as f:
+                return f.read().strip() or None
+        except OSError:
+            return None
+
+    def write_models_cache(self, content, etag):
+        try:
+            write_file_atomic(self.MODELS_CACHE_FILE, content)
+            if etag:
+                with open(self.MODELS_ETAG_FILE, 'w') as f:
+                    f.write(etag)
+            elif os.path.exists(self.MODELS_ETAG_FILE):
+                os.remove(self.MODELS_ETAG_FILE)
+        except OSError:
+            pass # The cache is only an optimization
+
+    def parse_models(self, content):
+        """Returns the model list from a /models response body, raising ValueError if it isn't one."""
+        models_data = json_loads(content)['data']
+        if not isinstance(models_data, list) or not all(isinstance(model, dict) and 'id' in model for model in models_data):
+            raise ValueError("Unexpected model catalog format")
+        return models_data
 
     def fetch_openrouter_models(self):
+        """Fetches the model catalog without touching the UI. Returns (models_data, error)."""
+        url = f"{OPENROUTER_BASE_URL}/models"
         try:
-            response = requests.get("https://openrouter.ai/api/v1/models")
+            headers = {}
+            etag = self.read_models_etag()
+            if etag:
+                headers['If-None-Match'] = etag
+            response = _SESSION.get(url, headers=headers, timeout=30)
             response.raise_for_status()
-            self.models_data = response.json()['data']
-            self.openrouter_models = sorted([model['id'] for model in self.models_data])
-
-            def update_ui():
-                self.llm_model_combo['values'] = self.openrouter_models
-                self.llm_model_combo.set("Select a model")
-                if hasattr(self, 'profile_model_combo'):
-                    self.profile_model_combo['values'] = self.openrouter_models
-                    self.profile_model_combo.set("Select a model to see parameters")
+            if response.status_code == 304:
+                # Catalog unchanged: mark the cache fresh and reuse what is already parsed, or the body on disk
+                try:
+                    os.utime(self.MODELS_CACHE_FILE)
+                    if self.models_data:
+                        return self.models_data, None
+                    with open(self.MODELS_CACHE_FILE, 'rb') as f:
+                        return self.parse_models(f.read()), None
+                except (OSError, ValueError, KeyError, TypeError):
+                    # The cached body is gone or unreadable: drop its ETag and fetch the full catalog
+                    if os.path.exists(self.MODELS_ETAG_FILE):
+                        os.remove(self.MODELS_ETAG_FILE)
+                    response = _SESSION.get(url, timeout=30)
+                    response.raise_for_status()
+            # Validated before caching, so a bad body is never revalidated against by its ETag
+            models_data = self.parse_models(response.content)
+            self.write_models_cache(response.content, response.headers.get('ETag'))
+            return models_data, None
+        except (requests.exceptions.RequestException, ValueError, KeyError, TypeError, OSError) as e:
+            return [], str(e)
+
+    def on_models_fetched(self, models_data, error):
+        if error:
+            if self.openrouter_models:
+                # Keep serving the stale list rather than leaving the user without models
+                if self.llm_model_combo.get() == "Fetching models...":
+                    self.llm_model_combo.set("Select a model")
+                return
+            messagebox.showerror("API Error", f"Failed to fetch models from OpenRouter: {error}")
+            self.llm_model_combo.set("Failed to fetch models")
+            return
 
-            self.root.after(0, update_ui)
-        except requests.exceptions.RequestException as e:
-            self.root.after(0, lambda: messagebox.showerror("API Error", f"Failed to fetch models from OpenRouter: {e}"))
-            self.root.after(0, lambda: self.llm_model_combo.set("Failed to fetch models"))
+        # A 304 revalidation hands back the very list already indexed; skip re-indexing and sorting it
+        if models_data is self.models_data and self.openrouter_models:
+            models = self.openrouter_models
+        else:
+            self.models_data = models_data
+            self.models_by_id = {model['id']: model for model in self.models_data}
+            # Frozen once per refresh, since every model selection tests each profile field against it
+            self.supported_params_by_id = {
+                model_id: frozenset(model['supported_parameters'])
+                for model_id, model in self.models_by_id.items()
+                if model.get('supported_parameters') is not None
+            }
+            models = tuple(sorted(self.models_by_id))
+        # Refreshing usually returns the same catalog; only hand Tk a new list when it changed
+        models_changed = models != self.openrouter_models
+        self.openrouter_models = models
+        if models_changed:
+            self.llm_model_combo['values'] = models
+        # A background refresh must not clobber a model the user already picked
+        if self.llm_model_combo.get() not in self.models_by_id:
+            self.llm_model_combo.set("Select a model")
+        if hasattr(self, 'profile_model_combo'):
+            if models_changed:
+                self.profile_model_combo['values'] = models
+            if self.profile_model_combo.get() not in self.models_by_id:
+                self.profile_model_combo.set("Select a model to see parameters")
 
     def add_llm_config(self):
         name = self.llm_name_entry.get()
@@ -912,30 +1951,56 @@ class DesktopUtilitiesApp:
             messagebox.showerror("Duplicate Error", f"The configuration name '{name}' already exists.")
             return
         self.llm_configs[name] = {"api_key": api_key, "model": model}
+        self.config_names_by_model.setdefault(model, name)
+        self.schedule_save()
         self.llm_name_entry.delete(0, tk.END)
         self.llm_api_key_entry.delete(0, tk.END)
         self.llm_model_combo.set("Select a model")
-        self.update_llm_list_ui()
+        self.llm_tree.insert('', tk.END, iid=name, values=(name, model, f"__{len(self.llm_configs)}"))
+
+    def index_llm_configs(self):
+        """Maps each model to the first config that uses it, which is the one saved items open with."""
+        index = {}
+        for name, config in self.llm_configs.items():
+            index.setdefault(config.get('model'), name)
+        self.config_names_by_model = index
 
     def update_llm_list_ui(self):
-        for widget in self.llm_list_frame.winfo_children():
-            widget.destroy()
-        for i, (name, data) in enumerate(self.llm_configs.items(), 1):
-            trigger_text = f"Trigger: __" + str(i)
-            label_text = f"{name} (Model: {data.get('model', 'N/A')})"
-            ttk.Label(self.llm_list_frame, text=label_text).grid(row=i, column=0, padx=5, sticky="w")
-            ttk.Label(self.llm_list_frame, text=trigger_text).grid(row=i, column=1, padx=10, sticky="w")
-            button_frame = ttk.Frame(self.llm_list_frame)
-            button_frame.grid(row=i, column=2, sticky='e')
-            ttk.Button(button_frame, text="Query", command=lambda n=name: self.show_query_window(n)).pack(side=tk.LEFT, padx=2)
-            ttk.Button(button_frame, text="Delete", command=lambda n=name: self.delete_llm_config(n)).pack(side=tk.LEFT, padx=2)
-        self.llm_list_frame.columnconfigure(0, weight=1)
-        self.llm_list_frame.columnconfigure(2, weight=1)
+        fill_treeview(self.llm_tree, (
+            (name, (name, data.get('model', 'N/A'), f"__{i}"))
+            for i, (name, data) in enumerate(self.llm_configs.items(), 1)
+        ))
+
+    def query_selected_llm_config(self):
+        selected_name = self.llm_tree.focus()
+        if not selected_name:
+            messagebox.showwarning("Selection Error", "Please select a configuration to query.")
+            return
+        self.show_query_window(selected_name)
+
+    def delete_selected_llm_config(self):
+        selected_name = self.llm_tree.focus()
+        if not selected_name:
+            messagebox.showwarning("Selection Error", "Please select a configuration to delete.")
+            return
+        self.delete_llm_config(selected_name)
 
     def delete_llm_config(self, name):
         if name in self.llm_configs:
-            del self.llm_configs[name]
-            self.update_llm_list_ui()
+            model = self.llm_configs.pop(name).get('model')
+            # Only the model this config was indexed under needs a new owner, if another config uses it
+            if self.config_names_by_model.get(model) == name:
+                del self.config_names_by_model[model]
+                for other_name, config in self.llm_configs.items():
+                    if config.get('model') == model:
+                        self.config_names_by_model[model] = other_name
+                        break
+            self.schedule_save()
+            # Triggers are positional: drop the one row and renumber only the rows after it
+            position = self.llm_tree.index(name)
+            self.llm_tree.delete(name)
+            for number, iid in enumerate(self.llm_tree.get_children()[position:], position + 1):
+                self.llm_tree.set(iid, 'trigger', f"__{number}")
 
     def create_config_profiles_tab(self, parent):
         main_frame = ttk.Frame(parent, padding="10")
@@ -948,7 +2013,8 @@ class DesktopUtilitiesApp:
 
         # Model selection for profile
         ttk.Label(editor_frame, text="Model:").grid(row=0, column=0, padx=5, pady=5, sticky="w")
-        self.profile_model_combo = ttk.Combobox(editor_frame, state="readonly")
+        self.profile_model_combo = ttk.Combobox(editor_frame, state="readonly", values=self.openrouter_models)
+        self.profile_model_combo.set("Select a model to see parameters")
         self.profile_model_combo.grid(row=0, column=1, columnspan=2, padx=5, pady=5, sticky="ew")
         self.profile_model_combo.bind("<<ComboboxSelected>>", self.on_profile_model_select)
 
@@ -980,6 +2046,10 @@ class DesktopUtilitiesApp:
         ]
 
         self.profile_entries = {}
+        self.profile_field_widgets = {} # The entries that have a state to toggle, i.e. all but the Checkbutton vars
+        # How each entry is read and written, so loading and saving dispatch on a string rather than isinstance
+        self.profile_field_kinds = {key: "text" if key == "tools" else widget_type for _, key, _, widget_type in fields}
+        self.disabled_profile_keys = set()
         row_counter = 2
         for label, key, default, widget_type in fields:
             ttk.Label(editor_frame, text=f"{label}:").grid(row=row_counter, column=0, padx=5, pady=2, sticky="w")
@@ -989,7 +2059,7 @@ class DesktopUtilitiesApp:
                 tools_frame = ttk.Frame(editor_frame)
                 widget = Text(tools_frame, height=5, width=30)
                 widget.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-                select_button = ttk.Button(tools_frame, text="Select...", command=lambda w=widget: self.open_select_tools_window(w))
+                select_button = ttk.Button(tools_frame, text="Select...", command=functools.partial(self.open_select_tools_window, widget))
                 select_button.pack(side=tk.LEFT, padx=(5, 0), anchor='n')
                 tools_frame.grid(row=row_counter, column=1, columnspan=2, padx=5, pady=2, sticky="ew")
                 editor_frame.columnconfigure(1, weight=1) # Ensure the frame expands
@@ -1012,6 +2082,7 @@ class DesktopUtilitiesApp:
                 widget.grid(row=row_counter, column=1, columnspan=2, padx=5, pady=2, sticky="ew")
 
             self.profile_entries[key] = widget
+            self.profile_field_widgets[key] = widget
             row_counter += 1
 
         # --- Checkbuttons for boolean parameters ---
@@ -1026,6 +2097,7 @@ class DesktopUtilitiesApp:
             chk = ttk.Checkbutton(editor_frame, text=label, variable=var)
             chk.grid(row=row_counter, column=0, columnspan=3, padx=5, pady=2, sticky="w")
             self.profile_entries[key] = var # Store the variable
+            self.profile_field_kinds[key] = "bool"
             row_counter += 1
             
         # Initially disable all fields
@@ -1053,11 +2125,8 @@ class DesktopUtilitiesApp:
         SelectToolsWindow(self, tools_text_widget)
 
     def get_model_parameters(self, model_name):
-        """Get supported parameters for a specific model"""
-        for model in self.models_data:
-            if model['id'] == model_name:
-                return model.get('supported_parameters')
-        return None
+        """Get the set of supported parameters for a specific model, or None if it doesn't say"""
+        return self.supported_params_by_id.get(model_name)
 
     def on_profile_model_select(self, event=None):
         selected_model = self.profile_model_combo.get()
@@ -1073,20 +2142,18 @@ class DesktopUtilitiesApp:
             self.toggle_profile_fields(True, supported_params)
 
     def toggle_profile_fields(self, enable, supported_params=None):
-        for key, widget in self.profile_entries.items():
-            if enable:
-                if supported_params is None or key in supported_params:
-                    if isinstance(widget, tk.BooleanVar):
-                        # Checkbuttons don't have a state property in the same way
-                        pass
-                    else:
-                        widget.config(state=tk.NORMAL)
-                else:
-                    if not isinstance(widget, tk.BooleanVar):
-                        widget.config(state=tk.DISABLED)
-            else:
-                if not isinstance(widget, tk.BooleanVar):
-                    widget.config(state=tk.DISABLED)
+        """Enables the fields in the supported_params set (all of them when None), disables the rest."""
+        disabled = set()
+        was_disabled = self.disabled_profile_keys
+        for key, widget in self.profile_field_widgets.items():
+            enabled = enable and (supported_params is None or key in supported_params)
+            if not enabled:
+                disabled.add(key)
+            # Switching between similar models flips only a few fields; leave the rest alone
+            if enabled == (key in was_disabled):
+                widget.config(state=tk.NORMAL if enabled else tk.DISABLED)
+        # Mirrors the widget states so saving a profile doesn't have to query Tk for them
+        self.disabled_profile_keys = disabled
 
     def add_llm_profile(self):
         profile_name = self.profile_name_entry.get().strip()
@@ -1104,14 +2171,15 @@ class DesktopUtilitiesApp:
         settings = {"model": model_name}
         for key, widget in self.profile_entries.items():
             # Only save enabled fields
-            if not isinstance(widget, tk.BooleanVar) and widget.cget('state') == tk.DISABLED:
+            if key in self.disabled_profile_keys:
                 continue
 
-            if isinstance(widget, tk.BooleanVar):
+            kind = self.profile_field_kinds[key]
+            if kind == "bool":
                 value = widget.get()
-            elif isinstance(widget, Text):
+            elif kind == "text":
                 value = widget.get("1.0", tk.END).strip()
-            else: # Entry or Spinbox
+            else: # Entry, Spinbox or Combobox
                 value = widget.get().strip()
 
             if not value and not isinstance(value, bool): # Skip empty values, but not boolean False
@@ -1120,20 +2188,24 @@ class DesktopUtilitiesApp:
             # Process and store the value
             if key == 'tools' and isinstance(value, str):
                 try:
-                    settings[key] = json.loads(value)
+                    settings[key] = json_loads(value)
                 except json.JSONDecodeError:
                     messagebox.showerror("JSON Error", "Invalid JSON format in the 'Tools' field.", parent=self.root)
                     return
-            elif isinstance(widget, ttk.Spinbox):
+            elif kind in ("spinbox_float", "spinbox_int"):
                 try:
-                    settings[key] = float(value) if "." in str(widget.cget('format')) else int(value)
+                    settings[key] = float(value) if kind == "spinbox_float" else int(value)
                 except ValueError:
                     settings[key] = value # Fallback to string if conversion fails
             else:
                 settings[key] = value
 
+        if profile_name not in self.llm_profiles:
+            index = bisect.bisect_left(self.profile_names, profile_name)
+            self.profile_names.insert(index, profile_name)
+            self.profiles_tree.insert('', index, iid=profile_name, values=(profile_name,))
         self.llm_profiles[profile_name] = settings
-        self.update_llm_profiles_ui()
+        self.schedule_save()
         messagebox.showinfo("Success", f"Profile '{profile_name}' saved.", parent=self.root)
 
     def delete_llm_profile(self):
@@ -1142,16 +2214,15 @@ class DesktopUtilitiesApp:
             messagebox.showwarning("Selection Error", "Please select a profile to delete.", parent=self.root)
             return
 
-        profile_name = self.profiles_tree.item(selected_item)['values'][0]
+        profile_name = selected_item
         if messagebox.askyesno("Confirm Delete", f"Are you sure you want to delete the profile '{profile_name}'?"):
-            if profile_name in self.llm_profiles:
-                del self.llm_profiles[profile_name]
-                self.update_llm_profiles_ui()
+            if self.llm_profiles.pop(profile_name, None) is not None:
+                self.schedule_save()
+                self.profile_names.remove(profile_name)
+                self.profiles_tree.delete(selected_item)
 
     def update_llm_profiles_ui(self):
-        self.profiles_tree.delete(*self.profiles_tree.get_children())
-        for name in sorted(self.llm_profiles.keys()):
-            self.profiles_tree.insert('', tk.END, values=(name,))
+        fill_treeview(self.profiles_tree, ((name, (name,)) for name in self.profile_names))
 
     def create_tools_tab(self, parent):
         main_frame = ttk.Frame(parent, padding="10")
@@ -1195,11 +2266,15 @@ class DesktopUtilitiesApp:
 
         self.update_tools_ui()
 
+    @staticmethod
+    def tool_row(tool):
+        func = tool.get('function', {})
+        return (func.get('name', ''), func.get('description', ''))
+
     def update_tools_ui(self):
-        self.tools_tree.delete(*self.tools_tree.get_children())
-        for i, tool in enumerate(self.tools):
-            func = tool.get('function', {})
-            self.tools_tree.insert('', tk.END, iid=i, values=(func.get('name', ''), func.get('description', '')))
+        """Rebuilds every tool row."""
+        self.tools_by_iid = {str(next(self.row_ids)): tool for tool in self.tools}
+        fill_treeview(self.tools_tree, ((iid, self.tool_row(tool)) for iid, tool in self.tools_by_iid.items()))
 
     # --- FIXED --- This method now correctly parses and saves the tool's parameter JSON
     def save_tool(self):
@@ -1213,22 +2288,20 @@ class DesktopUtilitiesApp:
 
         try:
             # The parameters field should contain a valid JSON Schema object.
-            params = json.loads(params_str) if params_str else {"type": "object", "properties": {}}
+            params = json_loads(params_str) if params_str else {"type": "object", "properties": {}}
         except json.JSONDecodeError:
             messagebox.showerror("JSON Error", "Invalid JSON in Parameters field. Please provide a valid JSON Schema object.", parent=self.root)
             return
 
-        # Find tool by function name
-        tool_to_update = None
-        for t in self.tools:
-            if t.get('function', {}).get('name') == name:
-                tool_to_update = t
-                break
-
+        tool_to_update = self.tools_by_name.get(name)
         if tool_to_update:
             if messagebox.askyesno("Confirm Overwrite", f"A tool named '{name}' already exists. Do you want to overwrite it?"):
                 tool_to_update['function']['description'] = description
                 tool_to_update['function']['parameters'] = params
+                for iid, tool in self.tools_by_iid.items():
+                    if tool is tool_to_update:
+                        self.tools_tree.item(iid, values=self.tool_row(tool))
+                        break
             else:
                 return  # User cancelled overwrite
         else:
@@ -1242,8 +2315,12 @@ class DesktopUtilitiesApp:
                 }
             }
             self.tools.append(new_tool)
+            self.tools_by_name[name] = new_tool
+            iid = str(next(self.row_ids))
+            self.tools_by_iid[iid] = new_tool
+            self.tools_tree.insert('', tk.END, iid=iid, values=self.tool_row(new_tool))
 
-        self.update_tools_ui()
+        self.schedule_save()
         # Clear fields
         self.tool_name_entry.delete(0, tk.END)
         self.tool_description_entry.delete(0, tk.END)
@@ -1258,18 +2335,21 @@ class DesktopUtilitiesApp:
             return
 
         if messagebox.askyesno("Confirm Delete", "Are you sure you want to delete the selected tool?"):
-            item_index = int(self.tools_tree.item(selected_item, "text")) # This is incorrect, need to use iid
-            item_index = int(selected_item)
-            del self.tools[item_index]
-            self.update_tools_ui()
+            tool = self.tools_by_iid.pop(selected_item)
+            # By identity: two tools may compare equal, and only the selected one should go
+            del self.tools[next(i for i, t in enumerate(self.tools) if t is tool)]
+            name = tool.get('function', {}).get('name')
+            if self.tools_by_name.get(name) is tool:
+                del self.tools_by_name[name]
+            self.tools_tree.delete(selected_item)
+            self.schedule_save()
 
     def load_tool_for_editing(self, event=None):
         selected_item = self.tools_tree.focus()
         if not selected_item:
             return
 
-        item_index = int(selected_item)
-        tool = self.tools[item_index]
+        tool = self.tools_by_iid[selected_item]
         function_def = tool.get('function', {})
 
         self.tool_name_entry.delete(0, tk.END)
@@ -1279,45 +2359,51 @@ class DesktopUtilitiesApp:
         self.tool_description_entry.insert(0, function_def.get('description', ''))
 
         self.tool_params_text.delete("1.0", tk.END)
-        params_json = json.dumps(function_def.get('parameters', {}), indent=4)
+        params_json = json_dumps_text(function_def.get('parameters', {}))
         self.tool_params_text.insert("1.0", params_json)
 
     def load_profile_for_editing(self, event=None):
         selected_item = self.profiles_tree.focus()
         if not selected_item: return
 
-        profile_name = self.profiles_tree.item(selected_item)['values'][0]
+        profile_name = selected_item
         profile_data = self.llm_profiles.get(profile_name, {})
 
-        model_name = profile_data.get("model")
-        if model_name and model_name in self.openrouter_models:
-            self.profile_model_combo.set(model_name)
-            self.on_profile_model_select()
-        else:
-            self.profile_model_combo.set("Select a model to see parameters")
-            self.toggle_profile_fields(False)
-
-
         self.profile_name_entry.delete(0, tk.END)
         self.profile_name_entry.insert(0, profile_name)
 
+        # Fill every field first: disabled Entry and Text widgets silently ignore edits, so
+        # they are re-enabled here and the model's field states are applied once at the end
+        get_value, kinds, disabled = profile_data.get, self.profile_field_kinds, self.disabled_profile_keys
         for key, widget in self.profile_entries.items():
-            value = profile_data.get(key, "")
-            if isinstance(widget, tk.BooleanVar):
+            value = get_value(key, "")
+            if key in disabled:
+                widget.config(state=tk.NORMAL)
+            kind = kinds[key]
+            if kind == "bool":
                 widget.set(bool(value))
-            elif isinstance(widget, Text):
+            elif kind == "text":
                 widget.delete("1.0", tk.END)
                 if key == 'tools' and isinstance(value, list):
-                    widget.insert("1.0", json.dumps(value, indent=4))
+                    widget.insert("1.0", json_dumps_text(value))
                 else:
                     widget.insert("1.0", str(value))
-            elif isinstance(widget, ttk.Entry):
+            elif kind == "entry":
                 widget.delete(0, tk.END)
                 widget.insert(0, str(value))
-            elif isinstance(widget, ttk.Combobox):
+            elif kind == "combobox":
                 widget.set(str(value))
-            elif isinstance(widget, ttk.Spinbox):
+            else: # Spinbox
                 widget.set(str(value) if value else "0")
+        self.disabled_profile_keys = set()
+
+        model_name = profile_data.get("model")
+        if model_name and model_name in self.models_by_id:
+            self.profile_model_combo.set(model_name)
+            self.on_profile_model_select()
+        else:
+            self.profile_model_combo.set("Select a model to see parameters")
+            self.toggle_profile_fields(False)
 
     def create_saved_items_tab(self, parent):
         main_frame = ttk.Frame(parent, padding="10")
@@ -1335,9 +2421,10 @@ class DesktopUtilitiesApp:
         self.saved_items_tree.column('model', width=200, anchor=tk.W)
         self.saved_items_tree.column('content', width=300, anchor=tk.W)
         self.saved_items_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        scrollbar = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL, command=self.saved_items_tree.yview)
-        self.saved_items_tree.configure(yscroll=scrollbar.set)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.saved_items_scrollbar = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL, command=self.saved_items_tree.yview)
+        self.saved_items_tree.configure(yscroll=self.on_saved_items_scroll)
+        self.saved_items_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.saved_items_page_pending = False
         action_frame = ttk.Frame(main_frame, padding=(0, 10, 0, 0))
         action_frame.pack(fill=tk.X)
         use_button = ttk.Button(action_frame, text="Use Selected", command=self.use_selected_saved_item)
@@ -1346,17 +2433,50 @@ class DesktopUtilitiesApp:
         delete_button.pack(side=tk.LEFT)
         self.update_saved_items_ui()
 
+    @staticmethod
+    def saved_item_row(item):
+        get = item.get
+        # Slice before joining so long conversations aren't copied just to show 75 characters
+        content_preview = (get('prompt') or '')[:75]
+        if len(content_preview) < 75:
+            content_preview = (content_preview + (get('response') or '')[:75])[:75]
+        content_preview = content_preview.replace('\n', ' ') + "..."
+        return (get('timestamp', ''), get('type', ''), get('model', ''), content_preview)
+
     def update_saved_items_ui(self):
+        """Shows the newest page of saved items."""
+        self.saved_items_by_iid = {}
         self.saved_items_tree.delete(*self.saved_items_tree.get_children())
-        for i, item in enumerate(self.saved_items):
-            content_preview = (item.get('prompt', '') + item.get('response', ''))[:75].replace('\n', ' ') + "..."
-            values = (item.get('timestamp', ''), item.get('type', ''), item.get('model', ''), content_preview)
-            self.saved_items_tree.insert('', tk.END, iid=i, values=values)
+        self.render_more_saved_items()
+
+    def render_more_saved_items(self):
+        """Appends the next page of older items below the rows already shown."""
+        self.saved_items_page_pending = False
+        # Rows always cover the newest len(saved_items_by_iid) items, newest first
+        end = len(self.saved_items) - len(self.saved_items_by_iid)
+        page = self.saved_items[max(0, end - self.SAVED_ITEMS_PAGE_SIZE):end]
+        rows = []
+        for item in reversed(page):
+            iid = str(next(self.row_ids))
+            self.saved_items_by_iid[iid] = item
+            rows.append((iid, self.saved_item_row(item)))
+        append_treeview_rows(self.saved_items_tree, rows)
+
+    def on_saved_items_scroll(self, first, last):
+        self.saved_items_scrollbar.set(first, last)
+        # Load the next page once the user nears the bottom of what has been rendered
+        if float(last) > 0.9 and not self.saved_items_page_pending and len(self.saved_items_by_iid) < len(self.saved_items):
+            self.saved_items_page_pending = True
+            self.root.after_idle(self.render_more_saved_items)
 
     def add_saved_item(self, item_type, model, prompt, response):
-        new_item = {"timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"), "type": item_type, "model": model, "prompt": prompt, "response": response}
+        new_item = {"id": self.new_saved_item_id(), "timestamp": datetime.now().isoformat(" ", "seconds"), "type": item_type, "model": model, "prompt": prompt, "response": response}
         self.saved_items.append(new_item)
-        self.update_saved_items_ui()
+        self.append_saved_item_to_file(new_item)
+        if hasattr(self, 'saved_items_tree'):
+            iid = str(next(self.row_ids))
+            self.saved_items_by_iid[iid] = new_item
+            self.saved_items_tree.insert('', 0, iid=iid, values=self.saved_item_row(new_item))
 
     def delete_selected_saved_item(self):
         selected_iid = self.saved_items_tree.focus()
@@ -1364,23 +2484,18 @@ class DesktopUtilitiesApp:
             messagebox.showwarning("Selection Error", "Please select an item to delete.")
             return
         if messagebox.askyesno("Confirm Delete", "Are you sure you want to delete the selected item?"):
-            item_index = int(selected_iid)
-            del self.saved_items[item_index]
-            self.update_saved_items_ui()
+            item = self.saved_items_by_iid.pop(selected_iid)
+            self.delete_saved_item(item)
+            self.saved_items_tree.delete(selected_iid)
 
     def use_selected_saved_item(self):
         selected_iid = self.saved_items_tree.focus()
         if not selected_iid:
             messagebox.showwarning("Selection Error", "Please select an item to use.")
             return
-        item_index = int(selected_iid)
-        item_to_use = self.saved_items[item_index]
+        item_to_use = self.saved_items_by_iid[selected_iid]
         model_to_find = item_to_use.get('model')
-        found_config_name = None
-        for name, config in self.llm_configs.items():
-            if config.get('model') == model_to_find:
-                found_config_name = name
-                break
+        found_config_name = self.config_names_by_model.get(model_to_find)
         if not found_config_name:
             messagebox.showerror("Not Found", f"No LLM configuration found for model '{model_to_find}'. Please create one first.")
             return
@@ -1407,38 +2522,60 @@ class DesktopUtilitiesApp:
         action_frame.pack(fill=tk.X)
         ttk.Button(action_frame, text="Add File", command=self.add_file).pack(side=tk.LEFT, padx=(0, 5))
         ttk.Button(action_frame, text="Delete Selected File", command=self.delete_selected_file).pack(side=tk.LEFT)
+        self.files_status_label = ttk.Label(action_frame, text="")
+        self.files_status_label.pack(side=tk.LEFT, padx=(10, 0))
         self.update_files_ui()
 
+    @staticmethod
+    def file_row(item):
+        return (item['filename'], item['type'], item['date_added'])
+
     def update_files_ui(self):
-        self.files_tree_view.delete(*self.files_tree_view.get_children())
-        for i, item in enumerate(self.files):
-            values = (item['filename'], item['type'], item['date_added'])
-            self.files_tree_view.insert('', tk.END, iid=i, values=values)
+        """Rebuilds every file row."""
+        fill_treeview(self.files_tree_view, self.file_rows.items())
 
     def add_file(self):
+        from tkinter import filedialog
         source_path = filedialog.askopenfilename()
         if not source_path: return
 
         filename = os.path.basename(source_path)
         dest_path = os.path.join(self.FILES_DIR, filename)
 
-        if os.path.exists(dest_path):
+        # Tracked files are known without a stat; untracked leftovers in FILES_DIR still need one
+        if filename in self.files or os.path.exists(dest_path):
             if not messagebox.askyesno("File Exists", "A file with this name already exists. Overwrite?"):
                 return
 
+        # Large files are copied on a worker thread so the window stays responsive
+        self.pending_copies += 1
+        self.files_status_label.config(text=f"Copying {filename}...")
+        # copyfile takes the platform fast path (sendfile/fcopyfile) and skips copying permission bits
+        future = run_in_background(shutil.copyfile, source_path, dest_path)
+        future.add_done_callback(lambda f: self.call_in_ui(self.finish_add_file, f, filename, dest_path))
+
+    def finish_add_file(self, future, filename, dest_path):
+        self.pending_copies -= 1
+        if not self.pending_copies:
+            self.files_status_label.config(text="")
         try:
-            shutil.copy(source_path, dest_path)
-            file_type = filename.split('.')[-1] if '.' in filename else 'Unknown'
-
-            self.files = [f for f in self.files if f['filename'] != filename]
+            future.result()
+            file_type = os.path.splitext(filename)[1][1:] or 'Unknown'
 
-            self.files.append({
+            new_file = {
                 "filename": filename,
                 "type": file_type,
-                "date_added": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                "date_added": datetime.now().isoformat(" ", "seconds"),
                 "path": dest_path
-            })
-            self.update_files_ui()
+            }
+            # An overwritten file moves to the end of the list
+            if self.files.pop(filename, None) is not None:
+                del self.file_rows[filename]
+                self.files_tree_view.delete(filename)
+            self.files[filename] = new_file
+            self.schedule_save()
+            self.file_rows[filename] = self.file_row(new_file)
+            self.files_tree_view.insert('', tk.END, iid=filename, values=self.file_rows[filename])
         except Exception as e:
             messagebox.showerror("File Error", f"Could not copy file: {e}")
 
@@ -1449,19 +2586,25 @@ class DesktopUtilitiesApp:
             return
 
         if messagebox.askyesno("Confirm Delete", "Are you sure you want to permanently delete this file?"):
-            item_index = int(selected_iid)
-            file_to_delete = self.files[item_index]
+            file_to_delete = self.files[selected_iid]
             try:
                 os.remove(file_to_delete['path'])
-                del self.files[item_index]
-                self.update_files_ui()
+                del self.files[selected_iid]
+                self.schedule_save()
+                del self.file_rows[selected_iid]
+                self.files_tree_view.delete(selected_iid)
             except Exception as e:
                 messagebox.showerror("File Error", f"Could not delete file: {e}")
 
     def show_query_window(self, config_name, initial_prompt=None, initial_response=None):
-        if config_name in self.open_query_windows:
-            self.open_query_windows[config_name].lift()
-            self.open_query_windows[config_name].focus_force()
+        query_window = self.open_query_windows.get(config_name)
+        if query_window is not None:
+            if query_window.state() == 'iconic':
+                query_window.deiconify()
+            elif self.window_has_focus(query_window):
+                return # Already in front with focus; skip the window manager round-trips
+            query_window.lift()
+            query_window.focus_force()
         else:
             config_details = self.llm_configs.get(config_name)
             if config_details:
@@ -1469,54 +2612,79 @@ class DesktopUtilitiesApp:
                 self.open_query_windows[config_name] = query_window
                 query_window.focus_force()
 
+    @staticmethod
+    def window_has_focus(window):
+        try:
+            focused = window.focus_displayof()
+        except KeyError:
+            return False # Focus is in a Tk-internal widget such as a popup menu
+        return focused is not None and focused.winfo_toplevel() is window
+
     def unregister_query_window(self, config_name):
-        if config_name in self.open_query_windows:
-            del self.open_query_windows[config_name]
+        self.open_query_windows.pop(config_name, None)
 
     def start_listener(self):
-        listener_thread = threading.Thread(target=self.run_keyboard_listener, daemon=True)
-        listener_thread.start()
-
-    def run_keyboard_listener(self):
-        with keyboard.Listener(on_press=self.on_key_press) as listener:
-            listener.join()
+        # The Listener is its own daemon thread; no wrapper thread is needed to join it
+        self.listener = keyboard.Listener(on_press=self.on_key_press)
+        self.listener.daemon = True
+        self.listener.start()
 
     def on_key_press(self, key):
-        try:
-            self.buffer += key.char
-        except AttributeError:
-            if key == keyboard.Key.space: self.buffer += " "
-            elif key == keyboard.Key.backspace: self.buffer = self.buffer[:-1]
-            else: self.buffer = ""
+        char = getattr(key, 'char', None)
+        if char is None:
+            if key == keyboard.Key.space: self.buffer.append(" ")
+            elif key == keyboard.Key.backspace:
+                if self.buffer: self.buffer.pop()
+            else: self.buffer.clear()
             return
-
-        match = re.search(r'__(\d+)$', self.buffer)
-        if match:
-            number = int(match.group(1))
-            trigger_len = len(match.group(0))
-            config_names = list(self.llm_configs.keys())
-            if 1 <= number <= len(config_names):
-                config_to_open = config_names[number - 1]
-                for _ in range(trigger_len):
-                    self.keyboard_controller.press(keyboard.Key.backspace)
-                    self.keyboard_controller.release(keyboard.Key.backspace)
-                    time.sleep(0.01)
-                self.root.after(0, self.show_query_window, config_to_open)
-                self.buffer = ""
+        if self.buffer.maxlen != self.buffer_limit:
+            # A longer trigger was added; re-cap here so only this thread ever replaces the buffer
+            self.buffer = deque(self.buffer, maxlen=self.buffer_limit)
+        self.buffer.append(char)
+
+        # Config triggers look like "__<n>"; only a digit can complete one, so only then build the text
+        if char.isdigit():
+            text = "".join(self.buffer)
+            digits_start = len(text.rstrip("0123456789"))
+        else:
+            text, digits_start = "", 0
+        if digits_start < len(text) and text.endswith("__", 0, digits_start):
+            number = int(text[digits_start:])
+            trigger_len = len(text) - digits_start + 2
+            if 1 <= number <= len(self.llm_configs):
+                config_to_open = next(itertools.islice(self.llm_configs, number - 1, None))
+                self.buffer.clear()
+                run_in_background(self.replace_trigger, trigger_len, None, config_to_open, report_errors=True)
                 return
 
-        for trigger, data in self.shortcuts.items():
-            if data["enabled"].get() and self.buffer.endswith(trigger):
-                for _ in range(len(trigger)):
-                    self.keyboard_controller.press(keyboard.Key.backspace)
-                    self.keyboard_controller.release(keyboard.Key.backspace)
-                    time.sleep(0.01)
-                self.keyboard_controller.type(data["output"])
-                self.buffer = ""
-                return
+        match = self.match_shortcut()
+        if match is not None:
+            trigger, shortcut = match
+            self.buffer.clear()
+            run_in_background(self.replace_trigger, len(trigger), shortcut["output"], report_errors=True)
+
+    def replace_trigger(self, trigger_len, output=None, config_to_open=None):
+        """Erases a typed trigger, then types its expansion or opens its query window.
+
+        Runs on a worker thread so the listener keeps receiving keys while the events are sent.
+        """
+        with self.expansion_lock:
+            controller = self.keyboard_controller
+            for _ in range(trigger_len):
+                controller.press(keyboard.Key.backspace)
+                controller.release(keyboard.Key.backspace)
+            # One short pause lets the target app apply the backspaces before anything else happens
+            time.sleep(0.002 * trigger_len)
+            if output:
+                controller.type(output)
+        if config_to_open:
+            # Opened only after erasing, so the backspaces can't land in the new window
+            self.call_in_ui(self.show_query_window, config_to_open)
 
 
 if __name__ == "__main__":
+    # Parse the config while Tk starts up
+    config_future = run_in_background(read_config_file, DesktopUtilitiesApp.CONFIG_FILE)
     app_root = tk.Tk()
-    app = DesktopUtilitiesApp(app_root)
+    app = DesktopUtilitiesApp(app_root, config_future)
     app_root.mainloop()